@@ -18,5 +18,90 @@ class Settings:
     NICHE_TEMPLATES_FILE: str = str(BASE_DIR / "rules" / "niche_templates.json")
     BASE_DIR: Path = BASE_DIR
 
+    # SQLite connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_CACHE_SIZE_KB: int = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+    DB_MMAP_SIZE_BYTES: int = int(os.getenv("DB_MMAP_SIZE_BYTES", str(256 * 1024 * 1024)))
+    DB_WRITE_BATCH_MAX: int = int(os.getenv("DB_WRITE_BATCH_MAX", "256"))
+
+    # Seconds between mtime checks of the rules / niche JSON files (0 disables hot reload)
+    KNOWLEDGE_RELOAD_INTERVAL: float = float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "2.0"))
+
+    # Minimum confidence for the local classifier to pick a niche before the first model call
+    NICHE_MIN_CONFIDENCE: float = float(os.getenv("NICHE_MIN_CONFIDENCE", "0.6"))
+
+    # Mark the stable system prompt blocks with cache_control breakpoints
+    PROMPT_CACHING_ENABLED: bool = os.getenv("PROMPT_CACHING_ENABLED", "true").lower() == "true"
+
+    # Shared outbound clients (HTTP/2 needs the optional `h2` package: pip install httpx[http2])
+    ANTHROPIC_TIMEOUT: float = float(os.getenv("ANTHROPIC_TIMEOUT", "600"))
+    ANTHROPIC_MAX_RETRIES: int = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+    ANTHROPIC_MAX_CONNECTIONS: int = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "100"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "15"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+    # Competitor site fetching
+    COMPETITOR_FETCH_CONCURRENCY: int = int(os.getenv("COMPETITOR_FETCH_CONCURRENCY", "10"))
+    COMPETITOR_FETCH_PER_HOST: int = int(os.getenv("COMPETITOR_FETCH_PER_HOST", "2"))
+    COMPETITOR_FETCH_DEADLINE: float = float(os.getenv("COMPETITOR_FETCH_DEADLINE", "20"))
+    COMPETITOR_MAX_PAGE_BYTES: int = int(os.getenv("COMPETITOR_MAX_PAGE_BYTES", str(1024 * 1024)))
+    PAGE_PARSE_WORKERS: int = int(os.getenv("PAGE_PARSE_WORKERS", "4"))
+    FETCH_CACHE_TTL: float = float(os.getenv("FETCH_CACHE_TTL", str(6 * 3600)))
+    FETCH_CACHE_MAX_BYTES: int = int(os.getenv("FETCH_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+    # SSE token streaming: flush coalesced tokens at this size or after this many seconds (0 = per token)
+    SSE_COALESCE_BYTES: int = int(os.getenv("SSE_COALESCE_BYTES", "512"))
+    SSE_COALESCE_WINDOW: float = float(os.getenv("SSE_COALESCE_WINDOW", "0.03"))
+    STREAM_MAX_RESPONSE_BYTES: int = int(os.getenv("STREAM_MAX_RESPONSE_BYTES", str(1024 * 1024)))
+
+    # Conversation context window: recent turns verbatim, older turns as a rolling summary
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))
+    CONTEXT_KEEP_TURNS: int = int(os.getenv("CONTEXT_KEEP_TURNS", "8"))
+    SUMMARY_MODEL: str = os.getenv("SUMMARY_MODEL", BRAINSTORM_MODEL)
+    SUMMARY_MAX_TOKENS: int = int(os.getenv("SUMMARY_MAX_TOKENS", "1000"))
+
+    # In-process LRU of per-session context (niche, phase, whitepaper, recent turns)
+    SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "256"))
+    SESSION_CACHE_MAX_BYTES: int = int(os.getenv("SESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Whitepaper history: a full checkpoint at most every N revisions, deltas in between
+    WHITEPAPER_CHECKPOINT_INTERVAL: int = int(os.getenv("WHITEPAPER_CHECKPOINT_INTERVAL", "10"))
+
+    # Final whitepaper: one model call per chapter, this many in flight at once
+    WHITEPAPER_PARALLELISM: int = int(os.getenv("WHITEPAPER_PARALLELISM", "4"))
+    WHITEPAPER_CHAPTER_MAX_TOKENS: int = int(os.getenv("WHITEPAPER_CHAPTER_MAX_TOKENS", "2500"))
+    WHITEPAPER_CACHE_MAX_BYTES: int = int(os.getenv("WHITEPAPER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Voice transcripts: rule-based clean-up first, the model only below this score (0..1)
+    TRANSCRIPT_FAST_PATH_ENABLED: bool = os.getenv("TRANSCRIPT_FAST_PATH_ENABLED", "true").lower() == "true"
+    TRANSCRIPT_MIN_QUALITY: float = float(os.getenv("TRANSCRIPT_MIN_QUALITY", "0.75"))
+
+    # Background jobs (final whitepaper, competitor analysis)
+    # Jobs are I/O-bound coroutines, so this is how many sessions can generate or analyze at once
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "16"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_HEARTBEAT_INTERVAL: float = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+    # A running job whose heartbeat is older than this was orphaned by a crash
+    JOB_STALE_AFTER: float = float(os.getenv("JOB_STALE_AFTER", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Live events kept in memory per running job for followers; older ones are replayed from the database
+    JOB_FEED_MAX_FRAMES: int = int(os.getenv("JOB_FEED_MAX_FRAMES", "2000"))
+
+    # Learned rules: a new rule this similar (0..1) to one in its category is merged into it
+    RULE_MERGE_THRESHOLD: float = float(os.getenv("RULE_MERGE_THRESHOLD", "0.6"))
+    # Each turn gets the N learned rules most relevant to it, at most RULES_PER_CATEGORY from one category
+    LEARNED_RULES_TOP_N: int = int(os.getenv("LEARNED_RULES_TOP_N", "8"))
+    RULES_PER_CATEGORY: int = int(os.getenv("RULES_PER_CATEGORY", "5"))
+    # A rule counts as applied when this share of its terms shows up in the response
+    RULE_APPLIED_COVERAGE: float = float(os.getenv("RULE_APPLIED_COVERAGE", "0.6"))
+
+    # Session listing: page size when the client doesn't ask, and the most it may ask for
+    SESSION_PAGE_SIZE: int = int(os.getenv("SESSION_PAGE_SIZE", "200"))
+    SESSION_PAGE_MAX: int = int(os.getenv("SESSION_PAGE_MAX", "1000"))
+
 
 settings = Settings()
@@ -1,84 +1,90 @@
+import asyncio
 import aiosqlite
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from config import settings
+from database.migrations import migrate
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "mindforge.db")
 
 
+class ConnectionPool:
+    """
+    Fixed-size pool of long-lived SQLite connections.
+    Opened once at app startup so request handlers never pay connect overhead.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] | None = None
+
+    async def open(self):
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await open_connection(self.path)
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        self._idle = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._idle is None:
+            raise RuntimeError("Database pool is not open")
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            # Never hand a connection with a dangling transaction to the next caller
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.put_nowait(conn)
+
+
+async def open_connection(path: str = DB_PATH) -> aiosqlite.Connection:
+    """Open a connection with the pragmas every MindForge connection uses."""
+    conn = await aiosqlite.connect(path, timeout=settings.DB_BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA journal_mode = WAL")
+    await conn.execute("PRAGMA synchronous = NORMAL")
+    await conn.execute(f"PRAGMA busy_timeout = {int(settings.DB_BUSY_TIMEOUT_MS)}")
+    await conn.execute(f"PRAGMA cache_size = -{int(settings.DB_CACHE_SIZE_KB)}")
+    await conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE_BYTES)}")
+    await conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+pool = ConnectionPool(DB_PATH, settings.DB_POOL_SIZE)
+
+
+def connection():
+    """Borrow a pooled connection: `async with connection() as db: ...`"""
+    return pool.acquire()
+
+
+async def open_pool():
+    await pool.open()
+
+
+async def close_pool():
+    await pool.close()
+
+
 async def get_db():
-    db = await aiosqlite.connect(DB_PATH)
-    db.row_factory = aiosqlite.Row
-    try:
+    async with connection() as db:
         yield db
-    finally:
-        await db.close()
 
 
 async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL DEFAULT 'Untitled Project',
-                niche_type TEXT,
-                current_phase INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completion_pct REAL DEFAULT 0.0,
-                status TEXT DEFAULT 'active'
-            );
-
-            CREATE TABLE IF NOT EXISTS conversation_turns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                role TEXT NOT NULL,
-                raw_transcript TEXT,
-                cleaned_text TEXT,
-                analysis TEXT,
-                gaps TEXT,
-                insights TEXT,
-                questions TEXT,
-                whitepaper_updates TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS whitepapers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL UNIQUE,
-                content TEXT NOT NULL DEFAULT '{}',
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS learned_rules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,
-                rule_text TEXT NOT NULL,
-                source_session_id TEXT,
-                times_applied INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                active INTEGER DEFAULT 1
-            );
-
-            CREATE TABLE IF NOT EXISTS competitor_analyses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                query TEXT NOT NULL,
-                results TEXT NOT NULL DEFAULT '[]',
-                summary TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            );
-        """)
-
-        # Migrations for existing databases
-        try:
-            await db.execute("ALTER TABLE sessions ADD COLUMN niche_type TEXT")
-        except Exception:
-            pass
-        try:
-            await db.execute("ALTER TABLE sessions ADD COLUMN current_phase INTEGER DEFAULT 1")
-        except Exception:
-            pass
-
-        await db.commit()
+    async with connection() as db:
+        await migrate(db)
@@ -0,0 +1,373 @@
+"""
+Versioned schema migrations keyed on `PRAGMA user_version`.
+
+Each migration runs once, in its own transaction, and bumps user_version.
+When the database is already at the latest version startup does a single
+pragma read and nothing else.
+"""
+import re
+
+import aiosqlite
+
+
+async def _add_column_if_missing(db: aiosqlite.Connection, table: str, column: str, ddl: str):
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    columns = {row["name"] for row in await cursor.fetchall()}
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+async def _v1_base_schema(db: aiosqlite.Connection):
+    # IF NOT EXISTS so databases created before versioning are adopted as-is
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL DEFAULT 'Untitled Project',
+            niche_type TEXT,
+            current_phase INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completion_pct REAL DEFAULT 0.0,
+            status TEXT DEFAULT 'active'
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            raw_transcript TEXT,
+            cleaned_text TEXT,
+            analysis TEXT,
+            gaps TEXT,
+            insights TEXT,
+            questions TEXT,
+            whitepaper_updates TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS whitepapers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL UNIQUE,
+            content TEXT NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS learned_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            rule_text TEXT NOT NULL,
+            source_session_id TEXT,
+            times_applied INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            active INTEGER DEFAULT 1
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS competitor_analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            query TEXT NOT NULL,
+            results TEXT NOT NULL DEFAULT '[]',
+            summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+
+    # Columns added after the first release
+    await _add_column_if_missing(db, "sessions", "niche_type", "TEXT")
+    await _add_column_if_missing(db, "sessions", "current_phase", "INTEGER DEFAULT 1")
+
+
+async def _v2_hot_path_indexes(db: aiosqlite.Connection):
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_turns_session_created "
+        "ON conversation_turns(session_id, created_at)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_competitor_session "
+        "ON competitor_analyses(session_id)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_updated "
+        "ON sessions(updated_at)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_rules_active_category_applied "
+        "ON learned_rules(active, category, times_applied)"
+    )
+
+
+async def _v3_turn_usage(db: aiosqlite.Connection):
+    # Token accounting from the model response, including prompt cache reads/writes
+    await _add_column_if_missing(db, "conversation_turns", "input_tokens", "INTEGER")
+    await _add_column_if_missing(db, "conversation_turns", "output_tokens", "INTEGER")
+    await _add_column_if_missing(db, "conversation_turns", "cache_creation_input_tokens", "INTEGER")
+    await _add_column_if_missing(db, "conversation_turns", "cache_read_input_tokens", "INTEGER")
+
+
+async def _v4_fetch_cache(db: aiosqlite.Connection):
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS fetch_cache (
+            url_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_fetch_cache_accessed ON fetch_cache(accessed_at)")
+
+
+async def _v5_conversation_summaries(db: aiosqlite.Connection):
+    # Rolling summary of the turns that have fallen out of the context window
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            covered_through_id INTEGER NOT NULL DEFAULT 0,
+            turns_covered INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+
+
+async def _v6_whitepaper_sections(db: aiosqlite.Connection):
+    # One row per section so an update rewrites only what changed. The
+    # whitepapers row stays as the per-session header (existence, updated_at);
+    # its content blob is no longer maintained.
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS whitepaper_sections (
+            session_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            content TEXT NOT NULL DEFAULT '',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, key),
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+    await db.execute("""
+        INSERT OR IGNORE INTO whitepaper_sections (session_id, key, content, updated_at)
+        SELECT w.session_id, j.key,
+               CASE WHEN j.type IN ('null', 'false') OR j.value IN ('[]', '{}') THEN ''
+                    ELSE CAST(j.value AS TEXT) END,
+               w.updated_at
+        FROM whitepapers w, json_each(w.content) j
+        WHERE json_valid(w.content) AND json_type(w.content) = 'object'
+        ORDER BY w.session_id, j.id
+    """)
+
+
+async def _v7_whitepaper_revisions(db: aiosqlite.Connection):
+    # Per-update section deltas with a full checkpoint every few revisions
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS whitepaper_revisions (
+            session_id TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('delta', 'checkpoint')),
+            payload TEXT NOT NULL,
+            changed TEXT NOT NULL DEFAULT '[]',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, rev),
+            FOREIGN KEY (session_id) REFERENCES sessions(id)
+        )
+    """)
+    # Existing whitepapers start their history with a checkpoint of what they hold now
+    await db.execute("""
+        INSERT OR IGNORE INTO whitepaper_revisions (session_id, rev, kind, payload, changed)
+        SELECT session_id, 1, 'checkpoint', json_group_object(key, content), json_group_array(key)
+        FROM (SELECT session_id, key, content FROM whitepaper_sections ORDER BY session_id, rowid)
+        GROUP BY session_id
+    """)
+
+
+async def _v8_generated_whitepapers(db: aiosqlite.Connection):
+    # Final documents keyed by a hash of their inputs; each whitepaper points at its latest
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS generated_whitepapers (
+            content_hash TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            markdown TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_generated_whitepapers_accessed "
+        "ON generated_whitepapers(accessed_at)"
+    )
+    await _add_column_if_missing(db, "whitepapers", "generated_hash", "TEXT")
+
+
+async def _v9_jobs(db: aiosqlite.Connection):
+    # Durable background jobs and the events they emitted (token frames excluded)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+            progress REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            heartbeat_at REAL
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id)")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS job_events (
+            job_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            frame TEXT NOT NULL,
+            PRIMARY KEY (job_id, seq),
+            FOREIGN KEY (job_id) REFERENCES jobs(id)
+        )
+    """)
+
+
+# Frozen copy of the rule tokenisation _v10 shipped with: later changes to
+# services.rule_text must not change what this migration does
+_V10_MERGE_THRESHOLD = 0.6
+_V10_WORD = re.compile(r"[^\W\d_]+")
+_V10_STOPWORDS = frozenset("""
+a an the and or but if then than that this these those there their they them it its
+is are was were be been being do does did have has had will would should could can may
+might must to of in on at by for from with about into over under as so not no yes
+also very just more most some any all each every other such what which who whom when
+where why how you your yours we our us he she his her i me my
+always never ask asking make sure consider
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+только ее мне было вот от меня еще нет о из ему теперь когда даже ну ли если уже
+или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может
+они тут где есть надо ней для мы тебя их чем была сам чтобы без будто чего раз тоже
+себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+почти мой тем нее сейчас были куда зачем всех никогда можно при наконец два об
+другой хоть после над больше тот через эти нас про всего них какая много разве три эту
+моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда
+конечно всю между спросить уточнить
+""".split())
+
+
+def _v10_terms(text: str) -> frozenset[str]:
+    return frozenset(
+        word[:6]
+        for word in (match.lower() for match in _V10_WORD.findall(text))
+        if len(word) > 2 and word not in _V10_STOPWORDS
+    )
+
+
+def _v10_similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+async def _v10_learned_rule_merging(db: aiosqlite.Connection):
+    # Near-duplicate rules are merged into one row; count how many it absorbed
+    await _add_column_if_missing(db, "learned_rules", "times_merged", "INTEGER NOT NULL DEFAULT 0")
+
+    # Collapse duplicates that piled up before merging existed, keeping the most-applied wording
+    cursor = await db.execute(
+        "SELECT id, category, rule_text, times_applied FROM learned_rules "
+        "WHERE active = 1 ORDER BY category, times_applied DESC, id"
+    )
+    kept: dict[str, list[tuple[int, frozenset[str]]]] = {}
+    merged: list[tuple[int, int, int]] = []  # (duplicate id, its times_applied, kept id)
+    async for row in cursor:
+        rule_terms = _v10_terms(row["rule_text"])
+        keepers = kept.setdefault(row["category"], [])
+        match = next(
+            (keep_id for keep_id, keep_terms in keepers
+             if _v10_similarity(rule_terms, keep_terms) >= _V10_MERGE_THRESHOLD),
+            None,
+        )
+        if match is None:
+            keepers.append((row["id"], rule_terms))
+        else:
+            merged.append((row["id"], row["times_applied"] or 0, match))
+    await cursor.close()
+
+    await db.executemany(
+        "UPDATE learned_rules SET times_applied = times_applied + ?, times_merged = times_merged + 1 WHERE id = ?",
+        [(applied, keep_id) for _, applied, keep_id in merged],
+    )
+    await db.executemany(
+        "UPDATE learned_rules SET active = 0 WHERE id = ?", [(dup_id,) for dup_id, _, _ in merged]
+    )
+
+
+async def _v11_session_keyset_index(db: aiosqlite.Connection):
+    # Session listing pages on (updated_at, id); this supersedes the updated_at index
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_updated_id ON sessions(updated_at DESC, id DESC)"
+    )
+    await db.execute("DROP INDEX IF EXISTS idx_sessions_updated")
+
+
+async def _v12_job_error_code(db: aiosqlite.Connection):
+    # Machine-readable reason a job failed (e.g. not_found), so routes can pick the HTTP status
+    await _add_column_if_missing(db, "jobs", "error_code", "TEXT")
+
+
+# Append only — never reorder or edit a migration that has shipped.
+MIGRATIONS = [
+    _v1_base_schema,
+    _v2_hot_path_indexes,
+    _v3_turn_usage,
+    _v4_fetch_cache,
+    _v5_conversation_summaries,
+    _v6_whitepaper_sections,
+    _v7_whitepaper_revisions,
+    _v8_generated_whitepapers,
+    _v9_jobs,
+    _v10_learned_rule_merging,
+    _v11_session_keyset_index,
+    _v12_job_error_code,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    cursor = await db.execute("PRAGMA user_version")
+    row = await cursor.fetchone()
+    return row[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Bring the schema up to SCHEMA_VERSION. Returns the number of migrations applied."""
+    if await get_schema_version(db) >= SCHEMA_VERSION:
+        return 0
+
+    applied = 0
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another worker got here first
+            if await get_schema_version(db) >= version:
+                await db.rollback()
+                continue
+            await migration(db)
+            await db.execute(f"PRAGMA user_version = {version}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        applied += 1
+    return applied
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+import aiosqlite
+
+from config import settings
+from database.db import DB_PATH, open_connection
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+
+class DatabaseWriter:
+    """
+    Single-writer actor for SQLite.
+
+    Every mutation is queued as an operation and executed by one task on one
+    dedicated connection. Whatever is pending when the task wakes up is run in
+    a single transaction (group commit), each operation inside its own savepoint
+    so one failure doesn't roll back its neighbours. Callers get a future that
+    resolves once the batch containing their write has been committed.
+    """
+
+    def __init__(self, path: str, max_batch: int):
+        self.path = path
+        self.max_batch = max_batch
+        self._conn: aiosqlite.Connection | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._conn = await open_connection(self.path)
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="sqlite-writer")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        await self._conn.close()
+        self._task = None
+        self._conn = None
+        self._queue = None
+
+    def submit(self, op: WriteOp) -> asyncio.Future:
+        """Queue a write operation. The returned future resolves after commit."""
+        if self._queue is None:
+            raise RuntimeError("Database writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        return future
+
+    async def run(self, op: WriteOp) -> Any:
+        """Queue a write operation and wait until it is durable."""
+        return await self.submit(op)
+
+    async def execute(self, sql: str, params: tuple = ()) -> int:
+        """Run a single statement through the writer. Returns the last row id."""
+        async def op(db: aiosqlite.Connection) -> int:
+            cursor = await db.execute(sql, params)
+            return cursor.lastrowid
+
+        return await self.run(op)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit_batch(batch)
+
+        # Flush anything queued behind the stop sentinel
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                await self._commit_batch([item])
+
+    async def _commit_batch(self, batch: list[tuple[WriteOp, asyncio.Future]]):
+        db = self._conn
+        done: list[tuple[asyncio.Future, Any]] = []
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                if future.cancelled():
+                    continue
+                await db.execute("SAVEPOINT write_op")
+                try:
+                    result = await op(db)
+                except Exception as e:
+                    await db.execute("ROLLBACK TO SAVEPOINT write_op")
+                    await db.execute("RELEASE SAVEPOINT write_op")
+                    future.set_exception(e)
+                    continue
+                await db.execute("RELEASE SAVEPOINT write_op")
+                done.append((future, result))
+            await db.commit()
+        except Exception as e:
+            logger.exception("Write batch of %d operations failed", len(batch))
+            if db.in_transaction:
+                await db.rollback()
+            for op, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+
+writer = DatabaseWriter(DB_PATH, settings.DB_WRITE_BATCH_MAX)
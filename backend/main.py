@@ -3,14 +3,35 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
-from database.db import init_db
-from routers import sessions, brainstorm, whitepaper, competitor
+from database.db import init_db, open_pool, close_pool
+from database.writer import writer
+from services import write_behind
+from services.clients import open_clients, close_clients
+from services.competitor_analyzer import shutdown_parse_pool
+from services.jobs import start_jobs, stop_jobs
+from services.knowledge_base import start_knowledge_base, stop_knowledge_base
+from services.rule_index import start_rule_index
+from routers import sessions, brainstorm, whitepaper, competitor, jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await open_pool()
     await init_db()
+    await writer.start()
+    await start_knowledge_base()
+    await start_rule_index()
+    await open_clients()
+    await start_jobs()
     yield
+    # Let background writes from the last responses land before shutting down
+    await write_behind.settled()
+    await stop_jobs()
+    await close_clients()
+    shutdown_parse_pool()
+    await stop_knowledge_base()
+    await writer.stop()
+    await close_pool()
 
 
 app = FastAPI(
@@ -36,6 +57,7 @@ app.include_router(sessions.router)
 app.include_router(brainstorm.router)
 app.include_router(whitepaper.router)
 app.include_router(competitor.router)
+app.include_router(jobs.router)
 
 
 @app.get("/api/health")
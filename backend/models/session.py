@@ -16,5 +16,20 @@ class SessionResponse(BaseModel):
     status: str
 
 
+class SessionSummary(BaseModel):
+    """Compact listing row: just what the sidebar shows."""
+    id: str
+    name: str
+    updated_at: str
+    completion_pct: float
+
+
 class SessionList(BaseModel):
     sessions: list[SessionResponse]
+    # Opaque; pass back as `cursor` for the next page. Absent on the last page
+    next_cursor: Optional[str] = None
+
+
+class SessionSummaryList(BaseModel):
+    sessions: list[SessionSummary]
+    next_cursor: Optional[str] = None
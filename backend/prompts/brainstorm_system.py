@@ -1,3 +1,5 @@
+from config import settings
+
 BRAINSTORM_SYSTEM_PROMPT = """
 You are **MindForge** — a senior product strategist, critical thinker, and website architecture consultant.
 
@@ -104,18 +106,18 @@ Format:
 <whitepaper_update>
 JSON object mapping section keys to updated content.
 Only include sections that have new information from this turn.
-Example: {{"project_overview": "Updated content...", "target_audience": "Updated content..."}}
+Example: {"project_overview": "Updated content...", "target_audience": "Updated content..."}
 </whitepaper_update>
 
 <new_rules>
 If the user raised a concern, question, or insight that isn't covered by existing rules and would be valuable for future projects, list them here.
-Format as JSON array: [{{"category": "...", "rule_text": "..."}}]
+Format as JSON array: [{"category": "...", "rule_text": "..."}]
 If nothing new, return: []
 </new_rules>
 
 <phase_info>
 JSON object with current conversation phase info.
-Format: {{"current_phase": 1, "phase_name": "Introduction", "next_milestone": "Classify business type and present initial suggestions"}}
+Format: {"current_phase": 1, "phase_name": "Introduction", "next_milestone": "Classify business type and present initial suggestions"}
 </phase_info>
 
 ## WHITEPAPER SECTIONS
@@ -168,24 +170,36 @@ For ANY website with an admin panel, dashboard, or CMS — this is NON-NEGOTIABL
 4. **When to ask** — Phase 3 (Structure) or Phase 4 (Details), when discussing management features.
 5. **How to ask** — Weave naturally: "Since your site has a management area, I'll set up your admin account. What email should I use? You'll get a secure temp password that must be changed on first login."
 6. **Additional admins** — Always ask if other team members need access, and collect their emails + roles.
-
-{niche_context}
-
-{rules_context}
-
-## CURRENT SESSION STATE
-
-{session_state}
 """
 
+SESSION_STATE_HEADER = "## CURRENT SESSION STATE\n\n"
+
 
 def build_system_prompt(
     rules_context: str,
     session_state: str,
     niche_context: str = "",
-) -> str:
-    return BRAINSTORM_SYSTEM_PROMPT.format(
-        rules_context=rules_context,
-        session_state=session_state,
-        niche_context=niche_context,
-    )
+    learned_rules: str = "",
+) -> list[dict]:
+    """
+    Build the system prompt as ordered content blocks for the Messages API.
+
+    Blocks run from most to least stable: the base prompt, the rules context
+    and the niche context each end with a cache breakpoint, so a later turn
+    only pays full price for the learned rules picked for it and the session
+    state that follow them.
+    """
+    cache_control = {"type": "ephemeral"} if settings.PROMPT_CACHING_ENABLED else None
+    blocks = []
+    for text in (BRAINSTORM_SYSTEM_PROMPT, rules_context, niche_context):
+        if not text:
+            continue
+        block = {"type": "text", "text": text}
+        if cache_control:
+            block["cache_control"] = cache_control
+        blocks.append(block)
+
+    if learned_rules:
+        blocks.append({"type": "text", "text": learned_rules})
+    blocks.append({"type": "text", "text": SESSION_STATE_HEADER + session_state})
+    return blocks
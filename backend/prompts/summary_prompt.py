@@ -0,0 +1,14 @@
+CONVERSATION_SUMMARY_PROMPT = """You are maintaining a rolling summary of a MindForge brainstorming session about a website idea.
+
+## Summary so far
+{previous_summary}
+
+## Turns to fold into the summary
+{turns}
+
+Update the summary so it also covers the new turns. Keep every decision, requirement, constraint, preference, open question and answered question; drop pleasantries and repetition. Write compact bullet points grouped by topic, in the same language the user speaks.
+
+Return ONLY the updated summary."""
+
+
+CONVERSATION_SUMMARY_SYSTEM = "You are a precise note-taker. Output only the updated summary, nothing else."
@@ -1,28 +1,36 @@
-WHITEPAPER_SYNTHESIS_PROMPT = """You are generating a final, polished whitepaper/product specification document based on all the brainstorming data collected during a MindForge session.
+# Bump whenever the prompts or chapter list below change: generated documents
+# are cached by a hash that includes it.
+WHITEPAPER_PROMPT_VERSION = "2"
+
+# Chapters of the final document, in order. Generated in parallel, one model
+# call each, all sharing WHITEPAPER_CONTEXT_PROMPT as a cached prefix.
+WHITEPAPER_CHAPTERS = [
+    ("Executive Summary", "2-3 paragraph overview of the entire project"),
+    ("Philosophy & Vision", "Why this exists, what problem it solves"),
+    ("Target Audience", "Detailed personas with demographics, needs, and behaviors"),
+    ("Pain Points & Solutions", "What problems exist and how this website addresses them"),
+    ("Feature Specification", "Detailed, prioritized feature list with descriptions"),
+    ("Information Architecture", "Complete sitemap with page descriptions"),
+    ("User Flows", "Step-by-step journeys for every key action"),
+    ("Data Architecture", "What data is stored, relationships, and management"),
+    ("Admin & CMS", "Full admin panel specification"),
+    ("Security Specification", "Authentication, authorization, data protection, compliance"),
+    ("Design Brief", "Visual direction, tone, references, typography, colors"),
+    ("Technical Architecture", "Stack recommendations, integrations, hosting, performance"),
+    ("Open Questions & Recommendations", "Unresolved items with your recommendations"),
+    ("Implementation Roadmap", "Suggested build phases (MVP, v1.0, v1.1, etc.)"),
+]
+
+WHITEPAPER_CONTEXT_PROMPT = """You are writing one chapter of a final, polished whitepaper/product specification document based on all the brainstorming data collected during a MindForge session. Other chapters are being written at the same time from the same data.
 
 ## Input Data
 
 Session conversation and accumulated whitepaper sections:
 {whitepaper_data}
 
-## Output Requirements
-
-Create a professional, comprehensive product specification document with:
-
-1. **Executive Summary** — 2-3 paragraph overview of the entire project
-2. **Philosophy & Vision** — Why this exists, what problem it solves
-3. **Target Audience** — Detailed personas with demographics, needs, and behaviors
-4. **Pain Points & Solutions** — What problems exist and how this website addresses them
-5. **Feature Specification** — Detailed, prioritized feature list with descriptions
-6. **Information Architecture** — Complete sitemap with page descriptions
-7. **User Flows** — Step-by-step journeys for every key action
-8. **Data Architecture** — What data is stored, relationships, and management
-9. **Admin & CMS** — Full admin panel specification
-10. **Security Specification** — Authentication, authorization, data protection, compliance
-11. **Design Brief** — Visual direction, tone, references, typography, colors
-12. **Technical Architecture** — Stack recommendations, integrations, hosting, performance
-13. **Open Questions & Recommendations** — Unresolved items with your recommendations
-14. **Implementation Roadmap** — Suggested build phases (MVP, v1.0, v1.1, etc.)
+## Document Outline
+
+{outline}
 
 ## Writing Style
 
@@ -31,9 +39,12 @@ Create a professional, comprehensive product specification document with:
 - Include rationale for recommendations
 - Flag assumptions clearly
 - Use tables and structured lists for specifications
-
-Return the complete whitepaper in Markdown format.
+- Stay within your chapter; don't repeat what belongs in other chapters
+- Write in the same language as the input data
 """
 
+WHITEPAPER_CHAPTER_PROMPT = """Write chapter {number}: **{title}** — {brief}.
+
+Start with the heading `## {number}. {title}` and return only this chapter, in Markdown."""
 
 WHITEPAPER_SYSTEM = "You are a senior product consultant generating a comprehensive, professional product specification document. Be thorough, specific, and actionable."
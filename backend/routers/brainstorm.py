@@ -1,10 +1,10 @@
 import json
-import aiosqlite
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 
-from database.db import DB_PATH
+from database.db import connection
 from models.conversation import MessageInput
+from services import rule_index, voice_processor, write_behind
 from services.ai_engine import stream_brainstorm
 
 router = APIRouter(prefix="/api/brainstorm", tags=["brainstorm"])
@@ -37,11 +37,23 @@ async def process_message(session_id: str, message: MessageInput):
     )
 
 
+@router.get("/transcripts/stats")
+async def transcript_cleanup_stats():
+    """How often voice transcripts were cleaned locally vs. by the model since startup."""
+    return voice_processor.stats.as_dict()
+
+
+@router.get("/rules/stats")
+async def learned_rule_index_stats():
+    """Size of the learned-rule index and how long retrieval takes."""
+    return rule_index.stats.as_dict(rule_index.index)
+
+
 @router.get("/{session_id}/history")
 async def get_history(session_id: str):
     """Get full conversation history for a session."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await write_behind.settled(session_id)
+    async with connection() as db:
         cursor = await db.execute(
             "SELECT * FROM conversation_turns WHERE session_id = ? ORDER BY created_at",
             (session_id,),
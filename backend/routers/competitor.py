@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from services.competitor_analyzer import stream_competitor_analysis
+from services import fetch_cache
+from services.jobs import jobs
 
 
 router = APIRouter(prefix="/api/competitor")
@@ -13,22 +14,48 @@ class CompetitorRequest(BaseModel):
     urls: list[str] | None = None
 
 
+@router.get("/cache/stats")
+async def fetch_cache_stats():
+    """Hit/miss counters for the competitor page cache since startup."""
+    return fetch_cache.stats.as_dict()
+
+
 @router.post("/{session_id}/analyze")
 async def analyze_competitors(session_id: str, request: CompetitorRequest):
     """
     Analyze competitor websites for a brainstorming session.
     Accepts either a search query or specific URLs to analyze.
-    Returns SSE stream with analysis progress and results.
+    Returns SSE stream with analysis progress and results. Runs as a
+    background job; the X-Job-Id header allows resuming at /api/jobs.
     """
     if not request.query and not request.urls:
         raise HTTPException(status_code=400, detail="Provide a query or list of URLs")
 
+    job_id = await jobs.enqueue(
+        "competitor_analysis", session_id, {"query": request.query, "urls": request.urls}
+    )
     return StreamingResponse(
-        stream_competitor_analysis(session_id, request.query, request.urls),
+        jobs.follow(job_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
+            "X-Job-Id": job_id,
         },
     )
+
+
+@router.post("/{session_id}/analyze/job")
+async def enqueue_competitor_analysis(session_id: str, request: CompetitorRequest):
+    """
+    Run a competitor analysis in the background. Returns a job id to poll at
+    /api/jobs/{job_id} or follow at /api/jobs/{job_id}/events.
+    """
+    if not request.query and not request.urls:
+        raise HTTPException(status_code=400, detail="Provide a query or list of URLs")
+
+    job_id = await jobs.enqueue(
+        "competitor_analysis", session_id, {"query": request.query, "urls": request.urls}
+    )
+    return {"job_id": job_id, "status": "queued"}
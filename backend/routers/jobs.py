@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from services.jobs import get_job, jobs
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Status, progress and (once finished) result or error of a background job."""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, after: int = 0):
+    """
+    SSE stream of a job's events. Reconnect with `after` set to the last
+    event seen to pick up where the stream left off.
+    """
+    if not await get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(
+        jobs.follow(job_id, after),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
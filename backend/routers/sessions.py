@@ -1,10 +1,13 @@
-import uuid
+import base64
 import json
-import aiosqlite
-from fastapi import APIRouter
+import uuid
+from fastapi import APIRouter, HTTPException, Query
 
-from database.db import DB_PATH
-from models.session import SessionCreate, SessionResponse, SessionList
+from config import settings
+from database.db import connection
+from database.writer import writer
+from models.session import SessionCreate, SessionResponse, SessionList, SessionSummary, SessionSummaryList
+from services import session_cache, write_behind
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
@@ -12,39 +15,100 @@ router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 @router.post("", response_model=SessionResponse)
 async def create_session(data: SessionCreate):
     session_id = str(uuid.uuid4())
-    async with aiosqlite.connect(DB_PATH) as db:
+
+    async def insert(db):
         await db.execute(
             "INSERT INTO sessions (id, name) VALUES (?, ?)",
             (session_id, data.name),
         )
         # Create empty whitepaper
-        await db.execute(
-            "INSERT INTO whitepapers (session_id, content) VALUES (?, ?)",
-            (session_id, json.dumps({})),
-        )
-        await db.commit()
+        await db.execute("INSERT INTO whitepapers (session_id) VALUES (?)", (session_id,))
+
+    await writer.run(insert)
+    session_cache.prime(session_id)
 
-        db.row_factory = aiosqlite.Row
+    async with connection() as db:
         cursor = await db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = await cursor.fetchone()
 
     return SessionResponse(**dict(row))
 
 
-@router.get("", response_model=SessionList)
-async def list_sessions():
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM sessions ORDER BY updated_at DESC")
-        rows = await cursor.fetchall()
-
-    return SessionList(sessions=[SessionResponse(**dict(row)) for row in rows])
+def encode_cursor(updated_at: str, session_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([updated_at, session_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        updated_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return updated_at, session_id
+
+
+@router.get("", response_model=SessionList | SessionSummaryList, response_model_exclude_none=True)
+async def list_sessions(
+    limit: int = Query(settings.SESSION_PAGE_SIZE, ge=1, le=settings.SESSION_PAGE_MAX),
+    cursor: str | None = None,
+    status: str | None = None,
+    niche_type: str | None = None,
+    min_completion: float | None = None,
+    max_completion: float | None = None,
+    compact: bool = False,
+):
+    """
+    Sessions, most recently updated first, a page at a time. Pass
+    `next_cursor` back as `cursor` for the next page; `compact` returns only
+    the fields the sidebar needs.
+    """
+    await write_behind.settled()
+
+    # Step 1: Filters, then the keyset condition — resumes right after the cursor row via the index
+    where, params = [], []
+    for column, value in (("status", status), ("niche_type", niche_type)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if min_completion is not None:
+        where.append("completion_pct >= ?")
+        params.append(min_completion)
+    if max_completion is not None:
+        where.append("completion_pct <= ?")
+        params.append(max_completion)
+    if cursor:
+        where.append("(updated_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    # Step 2: Only the columns the response needs; one extra row tells whether there is a next page
+    columns = "id, name, updated_at, completion_pct" if compact else "id, name, created_at, updated_at, completion_pct, status"
+    sql = f"SELECT {columns} FROM sessions"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+    async with connection() as db:
+        result = await db.execute(sql, (*params, limit + 1))
+        rows = await result.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+
+    if compact:
+        return SessionSummaryList(sessions=[SessionSummary(**dict(row)) for row in rows], next_cursor=next_cursor)
+    return SessionList(sessions=[SessionResponse(**dict(row)) for row in rows], next_cursor=next_cursor)
+
+
+@router.get("/cache/stats")
+async def session_cache_stats():
+    """Hit rate, evictions and footprint of the per-session context cache."""
+    return session_cache.stats.as_dict()
 
 
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(session_id: str):
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    await write_behind.settled(session_id)
+    async with connection() as db:
         cursor = await db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = await cursor.fetchone()
 
@@ -57,13 +121,11 @@ async def get_session(session_id: str):
 
 @router.patch("/{session_id}")
 async def rename_session(session_id: str, data: SessionCreate):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "UPDATE sessions SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (data.name, session_id),
-        )
-        await db.commit()
-        db.row_factory = aiosqlite.Row
+    await writer.execute(
+        "UPDATE sessions SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (data.name, session_id),
+    )
+    async with connection() as db:
         cursor = await db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = await cursor.fetchone()
     if not row:
@@ -74,9 +136,20 @@ async def rename_session(session_id: str, data: SessionCreate):
 
 @router.delete("/{session_id}")
 async def delete_session(session_id: str):
-    async with aiosqlite.connect(DB_PATH) as db:
+    await write_behind.settled(session_id)
+
+    async def delete(db):
         await db.execute("DELETE FROM conversation_turns WHERE session_id = ?", (session_id,))
+        await db.execute("DELETE FROM conversation_summaries WHERE session_id = ?", (session_id,))
+        await db.execute("DELETE FROM whitepaper_sections WHERE session_id = ?", (session_id,))
+        await db.execute("DELETE FROM whitepaper_revisions WHERE session_id = ?", (session_id,))
         await db.execute("DELETE FROM whitepapers WHERE session_id = ?", (session_id,))
+        await db.execute(
+            "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE session_id = ?)", (session_id,)
+        )
+        await db.execute("DELETE FROM jobs WHERE session_id = ?", (session_id,))
         await db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-        await db.commit()
+
+    await writer.run(delete)
+    session_cache.invalidate(session_id)
     return {"status": "deleted"}
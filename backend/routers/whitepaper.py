@@ -1,39 +1,117 @@
-import json
-import aiosqlite
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
-from database.db import DB_PATH
-from services.ai_engine import generate_final_whitepaper
+from database.db import connection
+from services import whitepaper_cache, whitepaper_store, write_behind
+from services.jobs import jobs
 
 router = APIRouter(prefix="/api/whitepaper", tags=["whitepaper"])
 
 
+@router.get("/cache/stats")
+async def whitepaper_cache_stats():
+    """Hit/miss counters for the generated whitepaper cache since startup."""
+    return whitepaper_cache.stats.as_dict()
+
+
 @router.get("/{session_id}")
-async def get_whitepaper(session_id: str):
-    """Get the current whitepaper state for a session."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_whitepaper(session_id: str, rev: int | None = None):
+    """Get the current whitepaper state for a session, or its state at revision `rev`."""
+    await write_behind.settled(session_id)
+    async with connection() as db:
         cursor = await db.execute(
-            "SELECT content, updated_at FROM whitepapers WHERE session_id = ?",
+            "SELECT updated_at FROM whitepapers WHERE session_id = ?",
             (session_id,),
         )
         row = await cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Whitepaper not found")
+        if rev is None:
+            sections = await whitepaper_store.read_sections(db, session_id)
+        else:
+            sections = await whitepaper_store.read_revision(db, session_id, rev)
+            if sections is None:
+                raise HTTPException(status_code=404, detail="Revision not found")
 
-    if not row:
-        raise HTTPException(status_code=404, detail="Whitepaper not found")
+    if rev is not None:
+        return {"session_id": session_id, "rev": rev, "sections": sections}
 
     return {
         "session_id": session_id,
-        "sections": json.loads(row["content"]),
+        "sections": sections,
         "updated_at": row["updated_at"],
     }
 
 
+@router.get("/{session_id}/revisions")
+async def list_whitepaper_revisions(session_id: str):
+    """Revision history of a whitepaper: which sections each update changed."""
+    await write_behind.settled(session_id)
+    async with connection() as db:
+        revisions = await whitepaper_store.list_revisions(db, session_id)
+    return {"session_id": session_id, "revisions": revisions}
+
+
+@router.get("/{session_id}/generated")
+async def get_generated_whitepaper(session_id: str):
+    """The last generated final whitepaper, without regenerating it."""
+    generated = await whitepaper_cache.latest(session_id)
+    if not generated:
+        raise HTTPException(status_code=404, detail="No generated whitepaper for this session")
+    return {
+        "session_id": session_id,
+        "whitepaper_markdown": generated.markdown,
+        "model": generated.model,
+        "generated_at": generated.created_at,
+    }
+
+
 @router.post("/{session_id}/generate")
-async def generate_whitepaper(session_id: str):
-    """Generate the final polished whitepaper using Opus."""
-    result = await generate_final_whitepaper(session_id)
+async def generate_whitepaper(session_id: str, force: bool = False):
+    """
+    Generate the final polished whitepaper. Unchanged content returns the
+    cached document unless `force` is set. Runs as a background job; this
+    request only waits for its result.
+    """
+    job_id = await jobs.enqueue("whitepaper", session_id, {"force": force})
+    job = await jobs.wait(job_id)
+    if job is None:
+        raise HTTPException(status_code=502, detail="Job not found")
+    if job["status"] != "succeeded":
+        # A session with nothing to write up is the caller's problem; anything else is the model's
+        status_code = 404 if job["error_code"] == "not_found" else 502
+        raise HTTPException(status_code=status_code, detail=job["error"])
     return {
         "session_id": session_id,
-        "whitepaper_markdown": result,
+        "whitepaper_markdown": job["result"]["whitepaper_markdown"],
     }
+
+
+@router.post("/{session_id}/generate/stream")
+async def generate_whitepaper_stream(session_id: str, force: bool = False):
+    """
+    Generate the final whitepaper as an SSE stream.
+    Chapters are written in parallel and sent as each one finishes. Runs as
+    a background job; the X-Job-Id header allows resuming at /api/jobs.
+    """
+    job_id = await jobs.enqueue("whitepaper", session_id, {"force": force})
+    return StreamingResponse(
+        jobs.follow(job_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "X-Job-Id": job_id,
+        },
+    )
+
+
+@router.post("/{session_id}/generate/job")
+async def enqueue_whitepaper_generation(session_id: str, force: bool = False):
+    """
+    Generate the final whitepaper in the background. Returns a job id to
+    poll at /api/jobs/{job_id} or follow at /api/jobs/{job_id}/events.
+    """
+    job_id = await jobs.enqueue("whitepaper", session_id, {"force": force})
+    return {"job_id": job_id, "status": "queued"}
@@ -1,74 +1,48 @@
+import asyncio
 import json
-import re
-import anthropic
-import aiosqlite
-from typing import AsyncGenerator
+import time
+from typing import Awaitable, AsyncGenerator, TypeVar
 
 from config import settings
-from database.db import DB_PATH
-from services.rules_engine import get_full_rules_context, add_learned_rule
-from services.niche_classifier import get_niche_context
+from database.writer import writer
+from services.rules_engine import applied_rules, get_rules_context, insert_learned_rule, record_rule_usage
+from services.niche_classifier import get_niche_context, classify_niche, classify_niche_confidently
 from services.voice_processor import clean_transcript
+from services.clients import get_anthropic
+from services.stream_parser import TagStreamParser
+from services.sse import ResponseBuffer, coalesce_tokens, sse_event
+from services import rule_index, session_cache, whitepaper_store, write_behind
+from services.context_window import ConversationWindow, build_window_messages, schedule_summary_update
+from services.session_cache import SessionContext
+from models.whitepaper import SECTION_LABELS, WHITEPAPER_SECTIONS
 from prompts.brainstorm_system import build_system_prompt
-from prompts.whitepaper_prompt import WHITEPAPER_SYNTHESIS_PROMPT, WHITEPAPER_SYSTEM
+
+# Sections shown to the user as-is
+DISPLAY_SECTIONS = ("analysis", "gaps", "insights", "questions")
+# Every XML-style section the brainstorm prompt asks the model for
+RESPONSE_SECTIONS = DISPLAY_SECTIONS + ("whitepaper_update", "new_rules", "phase_info")
 
 
 async def get_session_niche(session_id: str) -> str | None:
     """Get the niche type for a session, if classified."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "SELECT niche_type FROM sessions WHERE id = ?", (session_id,)
-        )
-        row = await cursor.fetchone()
-    return row[0] if row and row[0] else None
+    ctx = await session_cache.get(session_id)
+    return ctx.niche_type
 
 
 async def set_session_niche(session_id: str, niche_type: str):
     """Set the niche type for a session."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "UPDATE sessions SET niche_type = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (niche_type, session_id),
-        )
-        await db.commit()
-
-
-async def update_session_phase(session_id: str, phase: int):
-    """Update the current conversation phase."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "UPDATE sessions SET current_phase = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (phase, session_id),
-        )
-        await db.commit()
+    await writer.execute(
+        "UPDATE sessions SET niche_type = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (niche_type, session_id),
+    )
+    session_cache.set_niche(session_id, niche_type)
 
 
-async def get_session_state(session_id: str) -> str:
+def get_session_state(ctx: SessionContext, window: ConversationWindow) -> str:
     """Build current session state string for the system prompt."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
-        # Get session info
-        cursor = await db.execute(
-            "SELECT niche_type, current_phase FROM sessions WHERE id = ?", (session_id,)
-        )
-        session_row = await cursor.fetchone()
-        niche_type = session_row["niche_type"] if session_row else None
-        current_phase = session_row["current_phase"] if session_row else 1
-
-        # Get whitepaper state
-        cursor = await db.execute(
-            "SELECT content FROM whitepapers WHERE session_id = ?", (session_id,)
-        )
-        row = await cursor.fetchone()
-        whitepaper_content = json.loads(row["content"]) if row else {}
-
-        # Get conversation history
-        cursor = await db.execute(
-            "SELECT role, cleaned_text FROM conversation_turns WHERE session_id = ? ORDER BY created_at",
-            (session_id,),
-        )
-        turns = await cursor.fetchall()
+    niche_type = ctx.niche_type
+    current_phase = ctx.current_phase
+    whitepaper_content = ctx.whitepaper
 
     lines = []
 
@@ -76,7 +50,7 @@ async def get_session_state(session_id: str) -> str:
     if niche_type:
         lines.append(f"**Classified niche**: {niche_type}")
     lines.append(f"**Current phase**: {current_phase}")
-    lines.append(f"**Conversation turns so far**: {len(turns)}")
+    lines.append(f"**Conversation turns so far**: {window.total_turns}")
     lines.append("")
 
     lines.append("## Current Whitepaper State\n")
@@ -89,44 +63,74 @@ async def get_session_state(session_id: str) -> str:
     else:
         lines.append("All sections are empty — this is a new session.")
 
-    lines.append("\n## Conversation History\n")
-    if turns:
-        for turn in turns:
-            role = "User" if turn["role"] == "user" else "MindForge"
-            text = turn["cleaned_text"] or ""
-            lines.append(f"**{role}:** {text[:500]}")
+    # Recent turns are in the messages; older ones only survive as the summary
+    lines.append("\n## Earlier Conversation (summary)\n")
+    if window.summary:
+        lines.append(window.summary)
+    elif window.turns:
+        lines.append("The full conversation so far is in the messages.")
     else:
         lines.append("No conversation yet — this is the first message.")
 
     return "\n".join(lines)
 
 
-async def build_messages(session_id: str, new_message: str) -> list[dict]:
-    """Build the messages array from conversation history."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT role, cleaned_text FROM conversation_turns WHERE session_id = ? ORDER BY created_at",
-            (session_id,),
+def build_messages(window: ConversationWindow, new_message: str) -> list[dict]:
+    """Build the messages array from the token-budgeted conversation window."""
+    return build_window_messages(window, new_message)
+
+
+def extract_usage(message) -> dict:
+    """Token counts from a model response, including prompt cache reads/writes."""
+    usage = getattr(message, "usage", None)
+    return {
+        key: getattr(usage, key, None) or 0
+        for key in (
+            "input_tokens",
+            "output_tokens",
+            "cache_creation_input_tokens",
+            "cache_read_input_tokens",
         )
-        turns = await cursor.fetchall()
+    }
+
+
+def section_event(tag: str, content: str, parsed: dict) -> str | None:
+    """
+    Render the SSE event for one completed response section.
+    JSON sections that decode are also stored in `parsed` for persistence.
+    """
+    if not content:
+        return None
+    if tag in DISPLAY_SECTIONS:
+        return sse_event(tag, {"content": content})
 
-    messages = []
-    for turn in turns:
-        messages.append({
-            "role": turn["role"] if turn["role"] in ("user", "assistant") else "user",
-            "content": turn["cleaned_text"] or "",
-        })
+    try:
+        value = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+
+    if tag == "whitepaper_update" and isinstance(value, dict):
+        parsed[tag] = value
+        return sse_event("whitepaper_update", value)
+    if tag == "new_rules" and isinstance(value, list) and value:
+        parsed[tag] = [rule for rule in value if isinstance(rule, dict)]
+        return sse_event("new_rules", {"count": len(value), "rules": value})
+    if tag == "phase_info" and isinstance(value, dict):
+        parsed[tag] = value
+        return sse_event("phase_info", value)
+    return None
 
-    messages.append({"role": "user", "content": new_message})
-    return messages
 
+T = TypeVar("T")
 
-def parse_section(text: str, tag: str) -> str | None:
-    """Extract content from XML-style tags in the response."""
-    pattern = rf"<{tag}>(.*?)</{tag}>"
-    match = re.search(pattern, text, re.DOTALL)
-    return match.group(1).strip() if match else None
+
+async def timed(timings: dict[str, float], stage: str, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable`, recording how long it took in milliseconds under `stage`."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
 
 
 async def stream_brainstorm(
@@ -137,43 +141,80 @@ async def stream_brainstorm(
     Yields SSE-formatted events as the AI thinks.
     """
     try:
-        # Step 1: Clean transcript if from voice
-        cleaned_text = user_text
-        if is_voice and raw_transcript:
-            yield f"event: status\ndata: {json.dumps({'status': 'cleaning_transcript'})}\n\n"
-            cleaned_text = await clean_transcript(raw_transcript)
-            yield f"event: transcript\ndata: {json.dumps({'raw': raw_transcript, 'cleaned': cleaned_text})}\n\n"
-
-        # Step 2: Save user turn
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
+        # Steps 1-4 form a small dependency graph; independent steps overlap:
+        #
+        #   clean transcript ──┬─> save user turn ──────────┐
+        #                      └─> classify niche ─> rules ─┼─> system prompt + messages
+        #   load session context (state + history) ─────────┘
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        context_task = asyncio.create_task(timed(timings, "session_context", session_cache.get(session_id)))
+        try:
+            # Step 1: Clean transcript if from voice
+            cleaned_text = user_text
+            if is_voice and raw_transcript:
+                yield sse_event("status", {"status": "cleaning_transcript"})
+                cleaned_text = await timed(timings, "clean_transcript", clean_transcript(raw_transcript))
+                yield sse_event("transcript", {"raw": raw_transcript, "cleaned": cleaned_text})
+
+            yield sse_event("status", {"status": "loading_rules"})
+            ctx = await context_task
+
+            # Classify locally so the first turn already gets niche intelligence
+            niche_type = ctx.niche_type
+            match = None if niche_type else classify_niche_confidently(cleaned_text)
+
+            # Step 2: Save user turn — queued together with the niche so they share one commit
+            writes = [timed(timings, "save_user_turn", writer.execute(
                 "INSERT INTO conversation_turns (session_id, role, raw_transcript, cleaned_text) VALUES (?, 'user', ?, ?)",
                 (session_id, raw_transcript, cleaned_text),
+            ))]
+            if match:
+                writes.append(set_session_niche(session_id, match.niche))
+            user_turn_id, *_ = await asyncio.gather(*writes)
+            session_cache.append_turn(session_id, user_turn_id, "user", cleaned_text)
+
+            if match:
+                niche_type = match.niche
+                yield sse_event("niche_classified", {"niche": niche_type, "confidence": match.confidence, "source": "local"})
+
+            # Learned rules relevant to this message, niche and the sections still open
+            rules_started = time.perf_counter()
+            rules_context = get_rules_context(
+                cleaned_text,
+                niche_type,
+                [SECTION_LABELS[key] for key in WHITEPAPER_SECTIONS if not ctx.whitepaper.get(key)],
             )
-            await db.commit()
+            timings["rules"] = round((time.perf_counter() - rules_started) * 1000, 3)
+        finally:
+            # Only still pending if the client went away or a step failed
+            context_task.cancel()
 
         # Step 3: Build system prompt with rules + state + niche context
-        yield f"event: status\ndata: {json.dumps({'status': 'loading_rules'})}\n\n"
-        rules_context = await get_full_rules_context()
-        session_state = await get_session_state(session_id)
+        window = ctx.window_before(user_turn_id)
+        session_state = get_session_state(ctx, window)
 
-        # Load niche context if session has been classified
-        niche_type = await get_session_niche(session_id)
         niche_context = ""
         if niche_type:
             niche_context = get_niche_context(niche_type) or ""
 
-        system_prompt = build_system_prompt(rules_context, session_state, niche_context)
+        system_prompt = build_system_prompt(rules_context.text, session_state, niche_context, rules_context.learned_markdown)
 
         # Step 4: Build messages
-        messages = await build_messages(session_id, cleaned_text)
+        messages = build_messages(window, cleaned_text)
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        yield sse_event("timings", {"stage_ms": timings})
 
         # Step 5: Stream from Claude
-        yield f"event: status\ndata: {json.dumps({'status': 'thinking'})}\n\n"
+        yield sse_event("status", {"status": "thinking"})
 
-        client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        client = get_anthropic()
 
-        full_response = ""
+        response = ResponseBuffer(settings.STREAM_MAX_RESPONSE_BYTES)
+        # Structured sections are parsed and sent as each closing tag streams in
+        parser = TagStreamParser(RESPONSE_SECTIONS)
+        parsed: dict = {}
 
         try:
             async with client.messages.stream(
@@ -182,189 +223,143 @@ async def stream_brainstorm(
                 system=system_prompt,
                 messages=messages,
             ) as stream:
-                async for text in stream.text_stream:
-                    full_response += text
-                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+                async for text in coalesce_tokens(stream.text_stream):
+                    response.append(text)
+                    yield sse_event("token", {"text": text})
+                    for tag, content in parser.feed(text):
+                        event = section_event(tag, content, parsed)
+                        if event:
+                            yield event
+                final_message = await stream.get_final_message()
         except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+            yield sse_event("error", {"message": str(e)})
             return
 
-        # Step 6: Parse structured response
-        yield f"event: status\ndata: {json.dumps({'status': 'processing'})}\n\n"
-
-        analysis = parse_section(full_response, "analysis")
-        gaps = parse_section(full_response, "gaps")
-        insights = parse_section(full_response, "insights")
-        questions = parse_section(full_response, "questions")
-        wp_update_raw = parse_section(full_response, "whitepaper_update")
-        new_rules_raw = parse_section(full_response, "new_rules")
-        phase_info_raw = parse_section(full_response, "phase_info")
-
-        # Send parsed sections
-        if analysis:
-            yield f"event: analysis\ndata: {json.dumps({'content': analysis})}\n\n"
-        if gaps:
-            yield f"event: gaps\ndata: {json.dumps({'content': gaps})}\n\n"
-        if insights:
-            yield f"event: insights\ndata: {json.dumps({'content': insights})}\n\n"
-        if questions:
-            yield f"event: questions\ndata: {json.dumps({'content': questions})}\n\n"
-
-        # Step 7: Update whitepaper
-        if wp_update_raw:
-            try:
-                wp_updates = json.loads(wp_update_raw)
-                await update_whitepaper(session_id, wp_updates)
-                yield f"event: whitepaper_update\ndata: {json.dumps(wp_updates)}\n\n"
-            except json.JSONDecodeError:
-                pass
-
-        # Step 8: Learn new rules
-        if new_rules_raw:
-            try:
-                new_rules = json.loads(new_rules_raw)
-                for rule in new_rules:
-                    if "category" in rule and "rule_text" in rule:
-                        await add_learned_rule(rule["category"], rule["rule_text"], session_id)
-                if new_rules:
-                    yield f"event: new_rules\ndata: {json.dumps({'count': len(new_rules), 'rules': new_rules})}\n\n"
-            except json.JSONDecodeError:
-                pass
-
-        # Step 9: Process phase info and niche classification
-        if phase_info_raw:
-            try:
-                phase_info = json.loads(phase_info_raw)
-                current_phase = phase_info.get("current_phase", 1)
-                await update_session_phase(session_id, current_phase)
-                yield f"event: phase_info\ndata: {json.dumps(phase_info)}\n\n"
-            except json.JSONDecodeError:
-                pass
+        for tag, content in parser.close():
+            event = section_event(tag, content, parsed)
+            if event:
+                yield event
+
+        full_response = response.getvalue()
+        usage = extract_usage(final_message)
+        yield sse_event("usage", usage)
+
+        # Step 6: Work out what the structured response asked for
+        turn = {
+            "cleaned_text": full_response,
+            "analysis": parser.get("analysis"),
+            "gaps": parser.get("gaps"),
+            "insights": parser.get("insights"),
+            "questions": parser.get("questions"),
+            "whitepaper_updates": parser.get("whitepaper_update"),
+            **usage,
+        }
+        whitepaper_updates = parsed.get("whitepaper_update", {})
+        rules = [
+            rule for rule in parsed.get("new_rules", [])
+            if "category" in rule and "rule_text" in rule
+        ]
+        # Learned rules the response actually drew on; counted with the rest of the turn
+        used_rule_ids = applied_rules(
+            rules_context.learned, "\n".join(turn[name] or "" for name in DISPLAY_SECTIONS)
+        )
+        phase = parsed["phase_info"].get("current_phase", 1) if "phase_info" in parsed else None
 
         # Auto-detect niche from analysis on first message (if not already set)
-        if not niche_type and analysis:
-            detected_niche = detect_niche_from_analysis(analysis)
+        detected_niche = None
+        if not niche_type and turn["analysis"]:
+            detected_niche = detect_niche_from_analysis(turn["analysis"])
             if detected_niche:
-                await set_session_niche(session_id, detected_niche)
-                yield f"event: niche_classified\ndata: {json.dumps({'niche': detected_niche})}\n\n"
-
-        # Step 10: Save assistant turn
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                """INSERT INTO conversation_turns
-                (session_id, role, cleaned_text, analysis, gaps, insights, questions, whitepaper_updates)
-                VALUES (?, 'assistant', ?, ?, ?, ?, ?, ?)""",
-                (session_id, full_response, analysis, gaps, insights, questions, wp_update_raw),
-            )
-            await db.commit()
-
-        # Step 11: Calculate and update completion
-        completion = await calculate_completion(session_id)
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                "UPDATE sessions SET completion_pct = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (completion, session_id),
-            )
-            await db.commit()
-
-        yield f"event: completion\ndata: {json.dumps({'pct': completion})}\n\n"
-        yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
-
-    except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
-
-
-def detect_niche_from_analysis(analysis_text: str) -> str | None:
-    """Try to detect the niche type from the AI's analysis text."""
-    from services.niche_classifier import get_all_niche_keywords
-
-    analysis_lower = analysis_text.lower()
-    niche_keywords = get_all_niche_keywords()
+                yield sse_event("niche_classified", {"niche": detected_niche, "source": "analysis"})
 
-    scores: dict[str, int] = {}
-    for niche_key, keywords in niche_keywords.items():
-        score = sum(1 for kw in keywords if kw in analysis_lower)
-        if score > 0:
-            scores[niche_key] = score
-
-    if not scores:
-        return None
-
-    return max(scores, key=scores.get)
+        completion = whitepaper_store.completion_of({**ctx.whitepaper, **whitepaper_updates})
 
+        # Step 7: Persist everything in one transaction after the response is
+        # out; the next read of this session waits for it
+        write_behind.schedule(session_id, persist_turn_results(
+            session_id, turn, whitepaper_updates, rules, used_rule_ids, phase, detected_niche,
+        ))
 
-async def update_whitepaper(session_id: str, updates: dict):
-    """Update whitepaper sections with new content."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "SELECT content FROM whitepapers WHERE session_id = ?", (session_id,)
-        )
-        row = await cursor.fetchone()
+        yield sse_event("completion", {"pct": completion})
+        yield sse_event("done", {"session_id": session_id})
 
-        if row:
-            current = json.loads(row[0])
-        else:
-            current = {}
-
-        current.update(updates)
-
-        if row:
-            await db.execute(
-                "UPDATE whitepapers SET content = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
-                (json.dumps(current), session_id),
-            )
-        else:
-            await db.execute(
-                "INSERT INTO whitepapers (session_id, content) VALUES (?, ?)",
-                (session_id, json.dumps(current)),
-            )
-        await db.commit()
-
-
-async def calculate_completion(session_id: str) -> float:
-    """Calculate whitepaper completion percentage."""
-    from models.whitepaper import WHITEPAPER_SECTIONS
+    except Exception as e:
+        yield sse_event("error", {"message": str(e)})
+
+
+async def persist_turn_results(
+    session_id: str,
+    turn: dict,
+    whitepaper_updates: dict,
+    rules: list[dict],
+    used_rule_ids: list[int],
+    phase: int | None,
+    niche_type: str | None,
+):
+    """
+    Save everything a model response produced as one write unit: whitepaper
+    sections, learned rules and their usage counts, phase, niche, the assistant turn and the new
+    completion. The session cache is updated only once it has committed.
+    """
+    created_rule_ids = []
+
+    async def persist(db):
+        if whitepaper_updates:
+            await whitepaper_store.upsert_sections(db, session_id, whitepaper_updates)
+        for rule in rules:
+            rule["id"], created = await insert_learned_rule(db, rule["category"], rule["rule_text"], session_id)
+            if created:
+                created_rule_ids.append(rule["id"])
+        await record_rule_usage(db, used_rule_ids)
+        if phase is not None:
+            await db.execute("UPDATE sessions SET current_phase = ? WHERE id = ?", (phase, session_id))
+        if niche_type:
+            await db.execute("UPDATE sessions SET niche_type = ? WHERE id = ?", (niche_type, session_id))
 
-    async with aiosqlite.connect(DB_PATH) as db:
         cursor = await db.execute(
-            "SELECT content FROM whitepapers WHERE session_id = ?", (session_id,)
+            """INSERT INTO conversation_turns
+            (session_id, role, cleaned_text, analysis, gaps, insights, questions, whitepaper_updates,
+             input_tokens, output_tokens, cache_creation_input_tokens, cache_read_input_tokens)
+            VALUES (?, 'assistant', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                session_id, turn["cleaned_text"], turn["analysis"], turn["gaps"], turn["insights"],
+                turn["questions"], turn["whitepaper_updates"],
+                turn["input_tokens"], turn["output_tokens"],
+                turn["cache_creation_input_tokens"], turn["cache_read_input_tokens"],
+            ),
         )
-        row = await cursor.fetchone()
-
-    if not row:
-        return 0.0
-
-    content = json.loads(row[0])
-    filled = sum(1 for key in WHITEPAPER_SECTIONS if content.get(key))
-    return round((filled / len(WHITEPAPER_SECTIONS)) * 100, 1)
-
+        turn_id = cursor.lastrowid
 
-async def generate_final_whitepaper(session_id: str) -> str:
-    """Generate the final polished whitepaper using Opus."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT content FROM whitepapers WHERE session_id = ?", (session_id,)
+        pct = await whitepaper_store.completion(db, session_id)
+        await db.execute(
+            "UPDATE sessions SET completion_pct = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (pct, session_id),
         )
-        row = await cursor.fetchone()
+        return turn_id
 
-    if not row:
-        return "No whitepaper data found for this session."
-
-    whitepaper_data = row["content"]
+    try:
+        turn_id = await writer.run(persist)
+    except Exception:
+        # Nothing was written; don't let the cache or the rule index claim otherwise
+        session_cache.invalidate(session_id)
+        for rule_id in created_rule_ids:
+            rule_index.index.remove(rule_id)
+        raise
+
+    rule_index.index.record_usage(used_rule_ids)
+    if whitepaper_updates:
+        session_cache.update_whitepaper(session_id, whitepaper_updates)
+    if phase is not None:
+        session_cache.set_phase(session_id, phase)
+    if niche_type:
+        session_cache.set_niche(session_id, niche_type)
+    session_cache.append_turn(session_id, turn_id, "assistant", turn["cleaned_text"])
 
-    client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    # Fold turns that just left the window into the summary
+    schedule_summary_update(session_id)
 
-    response = await client.messages.create(
-        model=settings.WHITEPAPER_MODEL,
-        max_tokens=8000,
-        system=WHITEPAPER_SYSTEM,
-        messages=[
-            {
-                "role": "user",
-                "content": WHITEPAPER_SYNTHESIS_PROMPT.format(whitepaper_data=whitepaper_data),
-            }
-        ],
-    )
 
-    return response.content[0].text
+def detect_niche_from_analysis(analysis_text: str) -> str | None:
+    """Try to detect the niche type from the AI's analysis text."""
+    match = classify_niche(analysis_text)
+    return match.niche if match else None
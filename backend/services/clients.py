@@ -0,0 +1,88 @@
+import anthropic
+import httpx
+
+from config import settings
+
+USER_AGENT = "MindForge-Analyzer/1.0 (website planning tool)"
+
+
+class ClientRegistry:
+    """
+    Long-lived outbound clients shared by every request.
+
+    Created once in the app lifespan so model calls and competitor fetches
+    reuse pooled keep-alive connections instead of paying a TLS handshake
+    per request.
+    """
+
+    def __init__(self):
+        self._anthropic: anthropic.AsyncAnthropic | None = None
+        self._http: httpx.AsyncClient | None = None
+
+    async def open(self):
+        if self._anthropic is not None:
+            return
+        self._anthropic = anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            timeout=settings.ANTHROPIC_TIMEOUT,
+            max_retries=settings.ANTHROPIC_MAX_RETRIES,
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=settings.ANTHROPIC_TIMEOUT,
+                http2=settings.HTTP2_ENABLED,
+            ),
+        )
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=settings.HTTP_TIMEOUT,
+            follow_redirects=True,
+            http2=settings.HTTP2_ENABLED,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def close(self):
+        if self._anthropic is not None:
+            await self._anthropic.close()
+            self._anthropic = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    @property
+    def anthropic(self) -> anthropic.AsyncAnthropic:
+        if self._anthropic is None:
+            raise RuntimeError("Client registry is not open")
+        return self._anthropic
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            raise RuntimeError("Client registry is not open")
+        return self._http
+
+
+clients = ClientRegistry()
+
+
+async def open_clients():
+    await clients.open()
+
+
+async def close_clients():
+    await clients.close()
+
+
+def get_anthropic() -> anthropic.AsyncAnthropic:
+    return clients.anthropic
+
+
+def get_http() -> httpx.AsyncClient:
+    return clients.http
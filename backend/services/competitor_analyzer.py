@@ -1,13 +1,21 @@
+import asyncio
+import codecs
 import json
 import httpx
-import anthropic
-import aiosqlite
+from concurrent.futures import ThreadPoolExecutor
 from typing import AsyncGenerator
+from urllib.parse import urlsplit
 
 from config import settings
-from database.db import DB_PATH
+from database.writer import writer
+from services import fetch_cache, session_cache
+from services.clients import get_anthropic, get_http
+from services.page_extractor import PageExtractor
+from services.sse import ResponseBuffer, coalesce_tokens, sse_event
 
 
+PAGE_CHUNK_BYTES = 64 * 1024
+
 COMPETITOR_ANALYSIS_PROMPT = """
 You are analyzing competitor websites for a client who wants to build a {niche_type} website.
 
@@ -34,49 +42,77 @@ Respond in the same language as the business description.
 """
 
 
-async def fetch_site_content(url: str) -> dict:
-    """Fetch and extract basic content from a URL."""
+_parse_pool: ThreadPoolExecutor | None = None
+
+
+def parse_pool() -> ThreadPoolExecutor:
+    """The page-parsing thread pool, started on first use."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ThreadPoolExecutor(
+            max_workers=settings.PAGE_PARSE_WORKERS, thread_name_prefix="page-parse"
+        )
+    return _parse_pool
+
+
+def shutdown_parse_pool():
+    """Join the page-parsing threads at app shutdown; a later parse starts a new pool."""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=True, cancel_futures=True)
+        _parse_pool = None
+
+
+async def read_page(response: httpx.Response) -> dict:
+    """
+    Stream a response body into the incremental extractor.
+
+    Reads at most COMPETITOR_MAX_PAGE_BYTES and stops early once the head,
+    headings and links have been collected. Parsing runs on a small thread
+    pool so a heavy page doesn't stall every other SSE stream on the loop.
+    """
+    loop = asyncio.get_running_loop()
+    extractor = PageExtractor()
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(url, headers={
-                "User-Agent": "MindForge-Analyzer/1.0 (website planning tool)"
-            })
-            response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
 
-            # Extract text content (simplified — just get the HTML)
-            html = response.text
-            # Basic extraction: title, meta description, headings
-            import re
-            title_match = re.search(r"<title>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
-            title = title_match.group(1).strip() if title_match else "No title"
+    received = 0
+    async for chunk in response.aiter_bytes(PAGE_CHUNK_BYTES):
+        received += len(chunk)
+        await loop.run_in_executor(parse_pool(), extractor.feed, decoder.decode(chunk))
+        if extractor.enough or received >= settings.COMPETITOR_MAX_PAGE_BYTES:
+            break
+    await loop.run_in_executor(parse_pool(), extractor.close)
+    return extractor.result(content_length=received)
 
-            meta_desc_match = re.search(
-                r'<meta\s+name=["\']description["\']\s+content=["\'](.*?)["\']',
-                html, re.IGNORECASE
-            )
-            meta_desc = meta_desc_match.group(1).strip() if meta_desc_match else ""
-
-            # Extract all heading text
-            headings = re.findall(r"<h[1-6][^>]*>(.*?)</h[1-6]>", html, re.IGNORECASE | re.DOTALL)
-            headings_clean = [re.sub(r"<[^>]+>", "", h).strip() for h in headings[:20]]
-
-            # Extract nav links
-            nav_links = re.findall(r'<a[^>]+href=["\']([^"\']+)["\'][^>]*>(.*?)</a>', html, re.IGNORECASE | re.DOTALL)
-            nav_clean = [
-                {"href": href, "text": re.sub(r"<[^>]+>", "", text).strip()}
-                for href, text in nav_links[:30]
-                if text.strip() and not href.startswith("#") and not href.startswith("javascript:")
-            ]
-
-            return {
-                "url": url,
-                "status": "success",
-                "title": title,
-                "meta_description": meta_desc,
-                "headings": headings_clean,
-                "navigation_links": nav_clean,
-                "content_length": len(html),
-            }
+
+async def fetch_site_content(url: str) -> dict:
+    """Fetch and extract basic content from a URL, going through the persistent fetch cache."""
+    try:
+        url_key = fetch_cache.normalize_url(url)
+        cached = await fetch_cache.lookup(url_key)
+        if cached and cached.fresh:
+            fetch_cache.touch(cached)
+            return {"url": url, "status": "success", "cached": True, **cached.payload}
+
+        headers = fetch_cache.conditional_headers(cached) if cached else {}
+        async with get_http().stream("GET", url, headers=headers) as response:
+            if cached and response.status_code == 304:
+                fetch_cache.touch(cached, revalidated=True)
+                return {"url": url, "status": "success", "cached": True, **cached.payload}
+            response.raise_for_status()
+            page = await read_page(response)
+
+        fetch_cache.stats.misses += 1
+        await fetch_cache.store(
+            url_key,
+            page,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return {"url": url, "status": "success", **page}
     except Exception as e:
         return {
             "url": url,
@@ -85,6 +121,52 @@ async def fetch_site_content(url: str) -> dict:
         }
 
 
+async def fetch_sites(urls: list[str]) -> AsyncGenerator[dict, None]:
+    """
+    Fetch sites concurrently and yield results in completion order.
+
+    Concurrency is bounded globally and per host. Once the overall deadline
+    passes, sites still in flight are cancelled and reported as timed out so
+    the analysis can proceed with whatever has arrived.
+    """
+    global_limit = asyncio.Semaphore(settings.COMPETITOR_FETCH_CONCURRENCY)
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch(url: str) -> dict:
+        host = (urlsplit(url).hostname or "").lower()
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(settings.COMPETITOR_FETCH_PER_HOST))
+        # Take the host slot first so a queue for one slow host doesn't hold global slots
+        async with host_limit, global_limit:
+            return await fetch_site_content(url)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.COMPETITOR_FETCH_DEADLINE
+    tasks = {asyncio.create_task(fetch(url)): url for url in urls}
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+
+        for task in pending:
+            task.cancel()
+            yield {
+                "url": tasks[task],
+                "status": "error",
+                "error": f"Timed out after {settings.COMPETITOR_FETCH_DEADLINE:g}s",
+            }
+    finally:
+        # Also covers the client disconnecting mid-stream
+        for task in pending:
+            task.cancel()
+
+
 async def search_competitors(query: str) -> list[str]:
     """Search for competitor URLs. Returns a list of URLs to analyze."""
     # For MVP, we'll use a simple approach — the user provides URLs
@@ -107,38 +189,31 @@ async def stream_competitor_analysis(
         if not urls:
             urls = await search_competitors(query)
 
+        # Fetching the same site twice only wastes a slot
+        urls = list(dict.fromkeys(urls))
+
         if not urls:
-            yield f"event: error\ndata: {json.dumps({'message': 'No competitor URLs found. Please provide specific website URLs to analyze.'})}\n\n"
+            yield sse_event("error", {"message": "No competitor URLs found. Please provide specific website URLs to analyze."})
             return
 
-        yield f"event: status\ndata: {json.dumps({'status': 'fetching_competitors', 'count': len(urls)})}\n\n"
+        yield sse_event("status", {"status": "fetching_competitors", "count": len(urls)})
 
-        # Step 2: Fetch each competitor site
-        competitor_data = []
-        for i, url in enumerate(urls):
-            yield f"event: status\ndata: {json.dumps({'status': f'analyzing_site', 'current': i + 1, 'total': len(urls), 'url': url})}\n\n"
-            data = await fetch_site_content(url)
-            competitor_data.append(data)
-            yield f"event: site_fetched\ndata: {json.dumps({'url': url, 'status': data['status'], 'title': data.get('title', 'Unknown')})}\n\n"
+        # Step 2: Fetch competitor sites concurrently, reporting each as it lands
+        results: dict[str, dict] = {}
+        async for data in fetch_sites(urls):
+            results[data["url"]] = data
+            yield sse_event("site_fetched", {"url": data["url"], "status": data["status"], "title": data.get("title", "Unknown"), "current": len(results), "total": len(urls)})
 
-        # Step 3: Get session context
-        async with aiosqlite.connect(DB_PATH) as db:
-            db.row_factory = aiosqlite.Row
-            cursor = await db.execute(
-                "SELECT niche_type FROM sessions WHERE id = ?", (session_id,)
-            )
-            session = await cursor.fetchone()
-            niche_type = session["niche_type"] if session else "general"
+        # Keep the prompt in the order the user gave the sites
+        competitor_data = [results[url] for url in urls]
 
-            cursor = await db.execute(
-                "SELECT content FROM whitepapers WHERE session_id = ?", (session_id,)
-            )
-            wp = await cursor.fetchone()
-            wp_content = json.loads(wp["content"]) if wp else {}
-            business_desc = wp_content.get("project_overview", query)
+        # Step 3: Get session context
+        ctx = await session_cache.get(session_id)
+        niche_type = ctx.niche_type or "general"
+        business_desc = ctx.whitepaper.get("project_overview", query)
 
         # Step 4: Analyze with Claude
-        yield f"event: status\ndata: {json.dumps({'status': 'analyzing_with_ai'})}\n\n"
+        yield sse_event("status", {"status": "analyzing_with_ai"})
 
         competitor_text = json.dumps(competitor_data, indent=2, ensure_ascii=False)
         prompt = COMPETITOR_ANALYSIS_PROMPT.format(
@@ -147,32 +222,32 @@ async def stream_competitor_analysis(
             competitor_data=competitor_text,
         )
 
-        client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        client = get_anthropic()
 
-        full_response = ""
+        response = ResponseBuffer(settings.STREAM_MAX_RESPONSE_BYTES)
         try:
             async with client.messages.stream(
                 model=settings.BRAINSTORM_MODEL,
                 max_tokens=4000,
                 messages=[{"role": "user", "content": prompt}],
             ) as stream:
-                async for text in stream.text_stream:
-                    full_response += text
-                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+                async for text in coalesce_tokens(stream.text_stream):
+                    response.append(text)
+                    yield sse_event("token", {"text": text})
         except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+            yield sse_event("error", {"message": str(e)})
             return
 
+        full_response = response.getvalue()
+
         # Step 5: Save analysis to database
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                "INSERT INTO competitor_analyses (session_id, query, results, summary) VALUES (?, ?, ?, ?)",
-                (session_id, query, json.dumps(competitor_data, ensure_ascii=False), full_response),
-            )
-            await db.commit()
+        await writer.execute(
+            "INSERT INTO competitor_analyses (session_id, query, results, summary) VALUES (?, ?, ?, ?)",
+            (session_id, query, json.dumps(competitor_data, ensure_ascii=False), full_response),
+        )
 
-        yield f"event: analysis_complete\ndata: {json.dumps({'content': full_response, 'sites_analyzed': len(competitor_data)})}\n\n"
-        yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        yield sse_event("analysis_complete", {"content": full_response, "sites_analyzed": len(competitor_data)})
+        yield sse_event("done", {"session_id": session_id})
 
     except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+        yield sse_event("error", {"message": str(e)})
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from config import settings
+from database.db import connection
+from database.writer import writer
+from prompts.summary_prompt import CONVERSATION_SUMMARY_PROMPT, CONVERSATION_SUMMARY_SYSTEM
+from services.clients import get_anthropic
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConversationWindow:
+    """Rolling summary plus every turn it doesn't cover yet, oldest first."""
+
+    summary: str = ""
+    covered_through_id: int = 0
+    turns_covered: int = 0
+    turns: list[dict] = field(default_factory=list)
+
+    @property
+    def total_turns(self) -> int:
+        return self.turns_covered + len(self.turns)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) — good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+async def load_window(session_id: str, before_id: int | None = None) -> ConversationWindow:
+    """Load the summary and the turns after it. `before_id` excludes the turn being answered."""
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT summary, covered_through_id, turns_covered FROM conversation_summaries WHERE session_id = ?",
+            (session_id,),
+        )
+        row = await cursor.fetchone()
+        window = ConversationWindow()
+        if row:
+            window.summary = row["summary"]
+            window.covered_through_id = row["covered_through_id"]
+            window.turns_covered = row["turns_covered"]
+
+        cursor = await db.execute(
+            """SELECT id, role, cleaned_text FROM conversation_turns
+            WHERE session_id = ? AND id > ? AND id < ?
+            ORDER BY created_at, id""",
+            (session_id, window.covered_through_id, before_id or 2**63 - 1),
+        )
+        window.turns = [dict(r) for r in await cursor.fetchall()]
+    return window
+
+
+def split_window(window: ConversationWindow) -> tuple[list[dict], list[dict]]:
+    """
+    Split the unsummarized turns into (overflow, verbatim) — the one cutoff
+    both the prompt and the summary update go by.
+
+    Verbatim is at most CONTEXT_KEEP_TURNS recent turns, trimmed further until
+    it fits CONTEXT_TOKEN_BUDGET alongside the summary, and always starting
+    with a user turn. Overflow is everything older — the turns the next
+    summary update has to fold in.
+    """
+    turns = window.turns
+    budget = settings.CONTEXT_TOKEN_BUDGET - estimate_tokens(window.summary)
+    start = max(0, len(turns) - settings.CONTEXT_KEEP_TURNS)
+    used = sum(estimate_tokens(t["cleaned_text"] or "") for t in turns[start:])
+    while start < len(turns) and used > budget:
+        used -= estimate_tokens(turns[start]["cleaned_text"] or "")
+        start += 1
+    while start < len(turns) and turns[start]["role"] != "user":
+        start += 1
+    return turns[:start], turns[start:]
+
+
+def build_window_messages(window: ConversationWindow, new_message: str) -> list[dict]:
+    """
+    Messages array for the model: every turn the summary doesn't cover yet,
+    verbatim, then the new message. Overflow waiting for a summary update
+    stays in until the update lands, so no turn ever drops out of context.
+    """
+    messages = [
+        {
+            "role": turn["role"] if turn["role"] in ("user", "assistant") else "user",
+            "content": turn["cleaned_text"] or "",
+        }
+        for turn in window.turns
+    ]
+    messages.append({"role": "user", "content": new_message})
+    return messages
+
+
+async def update_summary(session_id: str):
+    """Fold turns that have fallen out of the window into the rolling summary."""
+    window = await load_window(session_id)
+    overflow, _ = split_window(window)
+    if not overflow:
+        return
+
+    transcript = "\n\n".join(
+        f"**{'User' if t['role'] == 'user' else 'MindForge'}:** {t['cleaned_text'] or ''}"
+        for t in overflow
+    )
+    response = await get_anthropic().messages.create(
+        model=settings.SUMMARY_MODEL,
+        max_tokens=settings.SUMMARY_MAX_TOKENS,
+        system=CONVERSATION_SUMMARY_SYSTEM,
+        messages=[{
+            "role": "user",
+            "content": CONVERSATION_SUMMARY_PROMPT.format(
+                previous_summary=window.summary or "(nothing yet)",
+                turns=transcript,
+            ),
+        }],
+    )
+    summary = response.content[0].text.strip()
+
+    await writer.execute(
+        """INSERT INTO conversation_summaries (session_id, summary, covered_through_id, turns_covered)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET
+            summary = excluded.summary,
+            covered_through_id = excluded.covered_through_id,
+            turns_covered = excluded.turns_covered,
+            updated_at = CURRENT_TIMESTAMP""",
+        (session_id, summary, overflow[-1]["id"], window.turns_covered + len(overflow)),
+    )
+    from services import session_cache
+    session_cache.set_summary(session_id, summary, overflow[-1]["id"], window.turns_covered + len(overflow))
+
+
+_running: dict[str, asyncio.Task] = {}
+
+
+def schedule_summary_update(session_id: str):
+    """Update the summary in the background, at most one update per session at a time."""
+    if session_id in _running:
+        return
+
+    async def run():
+        try:
+            await update_summary(session_id)
+        except Exception:
+            logger.exception("Summary update failed for session %s", session_id)
+        finally:
+            _running.pop(session_id, None)
+
+    _running[session_id] = asyncio.create_task(run())
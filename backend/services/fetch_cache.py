@@ -0,0 +1,159 @@
+import json
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import settings
+from database.db import connection
+from database.writer import writer
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@dataclass
+class FetchCacheStats:
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+        }
+
+
+@dataclass
+class CachedPage:
+    url_key: str
+    payload: dict
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.fetched_at < settings.FETCH_CACHE_TTL
+
+
+stats = FetchCacheStats()
+
+# Bytes of payload in the cache table, summed once and then kept up to date by store()
+_total_bytes: int | None = None
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: case-folded scheme/host, no default port, no fragment, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+async def lookup(url_key: str) -> CachedPage | None:
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT payload, etag, last_modified, fetched_at FROM fetch_cache WHERE url_key = ?",
+            (url_key,),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    return CachedPage(
+        url_key=url_key,
+        payload=json.loads(row["payload"]),
+        etag=row["etag"],
+        last_modified=row["last_modified"],
+        fetched_at=row["fetched_at"],
+    )
+
+
+def conditional_headers(page: CachedPage) -> dict:
+    headers = {}
+    if page.etag:
+        headers["If-None-Match"] = page.etag
+    if page.last_modified:
+        headers["If-Modified-Since"] = page.last_modified
+    return headers
+
+
+def touch(page: CachedPage, revalidated: bool = False):
+    """Record a cache hit. Fire-and-forget: nobody needs to wait for LRU bookkeeping."""
+    now = time.time()
+    if revalidated:
+        stats.revalidated += 1
+        page.fetched_at = now
+        sql = "UPDATE fetch_cache SET accessed_at = ?, fetched_at = ? WHERE url_key = ?"
+        params = (now, now, page.url_key)
+    else:
+        stats.hits += 1
+        sql = "UPDATE fetch_cache SET accessed_at = ? WHERE url_key = ?"
+        params = (now, page.url_key)
+
+    async def op(db):
+        await db.execute(sql, params)
+
+    writer.submit(op).add_done_callback(_ignore_result)
+
+
+async def store(url_key: str, payload: dict, etag: str | None, last_modified: str | None):
+    """Insert or replace a page, then evict least-recently-used pages over the size budget."""
+    global _total_bytes
+    stats.stores += 1
+    body = json.dumps(payload, ensure_ascii=False)
+    size = len(body.encode())
+    now = time.time()
+
+    async def op(db):
+        global _total_bytes
+        if _total_bytes is None:
+            cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM fetch_cache")
+            _total_bytes = (await cursor.fetchone())[0]
+        cursor = await db.execute("SELECT size FROM fetch_cache WHERE url_key = ?", (url_key,))
+        replaced = await cursor.fetchone()
+        await db.execute(
+            """INSERT INTO fetch_cache (url_key, payload, etag, last_modified, size, fetched_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url_key) DO UPDATE SET
+                payload = excluded.payload, etag = excluded.etag,
+                last_modified = excluded.last_modified, size = excluded.size,
+                fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at""",
+            (url_key, body, etag, last_modified, size, now, now),
+        )
+        _total_bytes += size - (replaced["size"] if replaced else 0)
+        excess = _total_bytes - settings.FETCH_CACHE_MAX_BYTES
+        if excess <= 0:
+            return
+        cursor = await db.execute("SELECT url_key, size FROM fetch_cache ORDER BY accessed_at")
+        victims = []
+        async for row in cursor:
+            if excess <= 0:
+                break
+            victims.append((row["url_key"],))
+            excess -= row["size"]
+            _total_bytes -= row["size"]
+        await cursor.close()
+        await db.executemany("DELETE FROM fetch_cache WHERE url_key = ?", victims)
+        stats.evictions += len(victims)
+
+    try:
+        await writer.run(op)
+    except Exception:
+        # The write was rolled back, so the running total may be off; re-sum it next time
+        _total_bytes = None
+        raise
+
+
+def _ignore_result(future):
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,420 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, AsyncIterator, Callable
+
+from config import settings
+from database.db import connection
+from database.writer import writer
+from services.competitor_analyzer import stream_competitor_analysis
+from services.sse import parse_sse_event, sse_event
+from services.whitepaper_generator import stream_final_whitepaper
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+@dataclass
+class JobKind:
+    # Builds the job's SSE event stream from (session_id, params)
+    run: Callable[..., AsyncIterator[str]]
+    # The event whose data becomes the job's result
+    result_event: str
+    # Maps an (event, data) pair to overall progress, or None if it says nothing new
+    progress: Callable[[str, dict], float | None]
+
+
+def _fraction(data: dict) -> float:
+    return data.get("current", 0) / data["total"] if data.get("total") else 0.0
+
+
+def whitepaper_progress(event: str, data: dict) -> float | None:
+    # Assembling after the last chapter is quick; 1.0 is left for success
+    if event == "chapter":
+        return round(0.95 * _fraction(data), 3)
+    return None
+
+
+def competitor_progress(event: str, data: dict) -> float | None:
+    # Fetching sites is the first part; the model's analysis takes the rest
+    if event == "site_fetched":
+        return round(0.4 * _fraction(data), 3)
+    if event == "status" and data.get("status") == "analyzing_with_ai":
+        return 0.4
+    return None
+
+
+JOB_KINDS = {
+    "whitepaper": JobKind(
+        run=lambda session_id, params: stream_final_whitepaper(session_id, force=params.get("force", False)),
+        result_event="whitepaper",
+        progress=whitepaper_progress,
+    ),
+    "competitor_analysis": JobKind(
+        run=lambda session_id, params: stream_competitor_analysis(session_id, params["query"], params.get("urls")),
+        result_event="analysis_complete",
+        progress=competitor_progress,
+    ),
+}
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    session_id: str
+    params: dict
+
+
+@dataclass
+class JobFeed:
+    """
+    Recent live events of a job running in this process, for followers to
+    tail. Only the last JOB_FEED_MAX_FRAMES are kept; a follower that falls
+    further behind catches up from the stored events.
+    """
+
+    frames: deque[tuple[int, str]] = field(default_factory=lambda: deque(maxlen=settings.JOB_FEED_MAX_FRAMES))
+    last_seq: int = 0
+    finished: bool = False
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    async def publish(self, seq: int, frame: str):
+        async with self.changed:
+            self.frames.append((seq, frame))
+            self.last_seq = seq
+            self.changed.notify_all()
+
+    async def finish(self):
+        async with self.changed:
+            self.finished = True
+            self.changed.notify_all()
+
+    async def follow(self, after: int) -> AsyncGenerator[tuple[int, str], None]:
+        """Frames after sequence number `after`; a gap in the numbers means some were dropped."""
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.last_seq > after or self.finished)
+                pending = [(seq, frame) for seq, frame in self.frames if seq > after]
+                finished = self.finished
+            for seq, frame in pending:
+                after = seq
+                yield seq, frame
+            if finished and after >= self.last_seq:
+                return
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of long-running work, executed by a pool of asyncio
+    workers so model calls don't hold HTTP requests open.
+
+    Running jobs heartbeat; a job whose heartbeat goes stale (its process
+    died) is put back in the queue and started again, up to JOB_MAX_ATTEMPTS.
+    On a clean shutdown jobs still running are requeued straight away.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._feeds: dict[str, JobFeed] = {}
+        # Set when a job starts running in this process, so its followers stop waiting for it
+        self._started: dict[str, asyncio.Event] = {}
+        self._wake: asyncio.Event | None = None
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        await self._requeue_stale()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{n}") for n in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._heartbeat(), name="job-heartbeat"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Whatever was interrupted goes back in the queue for the next start
+        interrupted = list(self._running)
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        self._running.clear()
+        if interrupted:
+            # Events already emitted stay: followers may be resuming from them
+            async def requeue(db):
+                await db.executemany(
+                    "UPDATE jobs SET status = 'queued', heartbeat_at = NULL WHERE id = ? AND status = 'running'",
+                    [(job_id,) for job_id in interrupted],
+                )
+
+            await writer.run(requeue)
+
+    async def enqueue(self, kind: str, session_id: str, params: dict) -> str:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = str(uuid.uuid4())
+        await writer.execute(
+            "INSERT INTO jobs (id, kind, session_id, params, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, session_id, json.dumps(params, ensure_ascii=False), time.time()),
+        )
+        if self._wake is not None:
+            self._wake.set()
+        return job_id
+
+    async def _claim(self) -> Job | None:
+        # Cheap read first so idle polling doesn't queue empty write transactions
+        async with connection() as db:
+            cursor = await db.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1")
+            if await cursor.fetchone() is None:
+                return None
+
+        now = time.time()
+
+        async def claim(db):
+            cursor = await db.execute(
+                """UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1
+                WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)
+                RETURNING id, kind, session_id, params""",
+                (now, now),
+            )
+            return await cursor.fetchone()
+
+        row = await writer.run(claim)
+        if row is None:
+            return None
+        return Job(row["id"], row["kind"], row["session_id"], json.loads(row["params"]))
+
+    async def _work(self):
+        while True:
+            job = await self._claim()
+            if job is None:
+                self._wake.clear()
+                try:
+                    # Also poll, for jobs enqueued by other processes
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+            self._running[job.id] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Worker stopping; stop() deals with the job itself
+                raise
+            except Exception:
+                logger.exception("Job %s crashed", job.id)
+            finally:
+                if task.done():
+                    self._running.pop(job.id, None)
+
+    async def _execute(self, job: Job):
+        kind = JOB_KINDS.get(job.kind)
+        feed = JobFeed()
+        self._feeds[job.id] = feed
+        started = self._started.pop(job.id, None)
+        if started is not None:
+            started.set()
+        result, error, error_code = None, None, None
+        try:
+            if kind is None:
+                error = f"Unknown job kind: {job.kind}"
+            else:
+                # A retried job carries on numbering after the events of its earlier attempts
+                async with connection() as db:
+                    cursor = await db.execute(
+                        "SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?", (job.id,)
+                    )
+                    seq = (await cursor.fetchone())[0]
+                async for frame in kind.run(job.session_id, job.params):
+                    seq += 1
+                    await feed.publish(seq, frame)
+                    event, data = parse_sse_event(frame)
+                    if event == kind.result_event:
+                        result = data
+                    elif event == "error":
+                        error = (data or {}).get("message", "Job failed")
+                        error_code = (data or {}).get("code")
+                    # Tokens are only for live followers; everything else is kept
+                    if event != "token":
+                        progress = kind.progress(event, data) if isinstance(data, dict) else None
+                        await self._record_event(job.id, seq, frame, progress)
+
+            status = "failed" if error or result is None else "succeeded"
+            if status == "failed" and error is None:
+                error = "Job finished without a result"
+            await writer.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = ?, error_code = ?,
+                    progress = COALESCE(?, progress), finished_at = ?
+                WHERE id = ?""",
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    error_code,
+                    1.0 if status == "succeeded" else None,
+                    time.time(),
+                    job.id,
+                ),
+            )
+        finally:
+            await feed.finish()
+            self._feeds.pop(job.id, None)
+
+    async def _record_event(self, job_id: str, seq: int, frame: str, progress: float | None):
+        async def op(db):
+            await db.execute(
+                "INSERT INTO job_events (job_id, seq, frame) VALUES (?, ?, ?)", (job_id, seq, frame)
+            )
+            if progress is not None:
+                await db.execute("UPDATE jobs SET progress = ? WHERE id = ?", (progress, job_id))
+
+        await writer.run(op)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            try:
+                if self._running:
+                    now = time.time()
+
+                    async def beat(db):
+                        await db.executemany(
+                            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                            [(now, job_id) for job_id in self._running],
+                        )
+
+                    await writer.run(beat)
+                await self._requeue_stale()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    async def _requeue_stale(self):
+        """Put jobs orphaned by a dead process back in the queue, or fail them after too many tries."""
+        cutoff = time.time() - settings.JOB_STALE_AFTER
+
+        async def requeue(db):
+            cursor = await db.execute(
+                "SELECT id, attempts FROM jobs WHERE status = 'running' AND COALESCE(heartbeat_at, 0) < ?",
+                (cutoff,),
+            )
+            stale = [(row["id"], row["attempts"]) for row in await cursor.fetchall()]
+            for job_id, attempts in stale:
+                if attempts >= settings.JOB_MAX_ATTEMPTS:
+                    await db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (f"Interrupted {attempts} times", time.time(), job_id),
+                    )
+                else:
+                    await db.execute(
+                        "UPDATE jobs SET status = 'queued', heartbeat_at = NULL WHERE id = ?", (job_id,)
+                    )
+            return len(stale)
+
+        if await writer.run(requeue) and self._wake is not None:
+            self._wake.set()
+
+    async def follow(self, job_id: str, after: int = 0) -> AsyncGenerator[str, None]:
+        """
+        Stream a job's events after sequence number `after`: live from this
+        process while it runs here, otherwise from the stored events (which
+        leave out token frames) until the job finishes. While the job waits
+        for a worker a `queued` status is sent, so the stream isn't silent.
+        """
+        announced = False
+        started = None
+        try:
+            while True:
+                feed = self._feeds.get(job_id)
+                if feed is not None:
+                    async for seq, frame in feed.follow(after):
+                        if seq > after + 1:
+                            # Fell behind the live buffer: replay what was stored (tokens are gone)
+                            for row in await self._stored_events(job_id, after, seq):
+                                yield row["frame"]
+                        after = seq
+                        yield frame
+                    if feed.finished:
+                        return
+                    continue
+                # Registered in the same step as the feed check: a job starting here publishes its feed, then sets this
+                started = self._started.setdefault(job_id, asyncio.Event())
+
+                rows = await self._stored_events(job_id, after)
+                async with connection() as db:
+                    cursor = await db.execute("SELECT status, error, error_code FROM jobs WHERE id = ?", (job_id,))
+                    job = await cursor.fetchone()
+
+                for row in rows:
+                    after = row["seq"]
+                    yield row["frame"]
+                if job is None:
+                    yield sse_event("error", {"message": "Job not found"})
+                    return
+                if job["status"] in TERMINAL_STATUSES:
+                    if job["status"] == "failed" and not rows:
+                        yield sse_event("error", {"message": job["error"], "code": job["error_code"]})
+                    return
+                if job["status"] == "queued" and not announced:
+                    announced = True
+                    yield sse_event("status", {"status": "queued"})
+                # Woken as soon as a worker here picks the job up; jobs run by another process are polled
+                try:
+                    await asyncio.wait_for(started.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if started is not None and self._started.get(job_id) is started:
+                del self._started[job_id]
+
+    async def _stored_events(self, job_id: str, after: int, before: int | None = None) -> list:
+        async with connection() as db:
+            cursor = await db.execute(
+                "SELECT seq, frame FROM job_events WHERE job_id = ? AND seq > ? AND seq < ? ORDER BY seq",
+                (job_id, after, before or 2**63 - 1),
+            )
+            return await cursor.fetchall()
+
+    async def wait(self, job_id: str) -> dict | None:
+        """Follow a job to the end and return its final state."""
+        async for _ in self.follow(job_id):
+            pass
+        return await get_job(job_id)
+
+
+async def get_job(job_id: str) -> dict | None:
+    async with connection() as db:
+        cursor = await db.execute(
+            """SELECT id, kind, session_id, status, progress, result, error, error_code, attempts,
+                      created_at, started_at, finished_at
+            FROM jobs WHERE id = ?""",
+            (job_id,),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+jobs = JobQueue(settings.JOB_WORKERS)
+
+
+async def start_jobs():
+    await jobs.start()
+
+
+async def stop_jobs():
+    await jobs.stop()
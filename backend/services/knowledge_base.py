@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from config import settings
+from services.niche_matcher import NicheMatcher
+
+logger = logging.getLogger(__name__)
+
+RULES_HEADER = "## BRAINSTORMING RULES & QUESTION BANK\n"
+
+
+@dataclass(frozen=True)
+class KnowledgeBase:
+    """
+    Immutable snapshot of the on-disk rules and niche templates.
+
+    Everything the prompt builder needs is rendered once at load time, so the
+    turn hot path only does dictionary lookups. A reload builds a complete new
+    snapshot and swaps the module-level reference in one assignment.
+    """
+
+    static_rules_markdown: str  # base rules and question bank, every category plus the meta rules
+    niche_contexts: Mapping[str, str]
+    niche_labels: Mapping[str, str]
+    niche_matcher: NicheMatcher
+    rules_mtime: float
+    niches_mtime: float
+
+
+def render_category_block(cat_data: dict) -> str:
+    lines = [f"### {cat_data['label']}", "**Questions to consider:**"]
+    for q in cat_data["base_questions"]:
+        lines.append(f"- {q}")
+
+    lines.append("**Thinking rules:**")
+    for r in cat_data["thinking_rules"]:
+        lines.append(f"- {r}")
+    return "\n".join(lines)
+
+
+def render_meta_rules(meta_rules: dict) -> str:
+    lines = ["### Meta Rules"]
+    for section_key, rules in meta_rules.items():
+        lines.append(f"**{section_key.replace('_', ' ').title()}:**")
+        for r in rules:
+            lines.append(f"- {r}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def render_niche_context(niche: dict) -> str:
+    """Build the context string for one niche to inject into the system prompt."""
+    lines = []
+    lines.append(f"## NICHE INTELLIGENCE: {niche['label']}\n")
+    lines.append(f"Business type: {niche['description']}\n")
+
+    lines.append("### Suggested Pages")
+    lines.append("Present these as YOUR recommendation. Say: 'Based on businesses like yours, I recommend these pages:'")
+    for page in niche["suggested_pages"]:
+        priority_tag = {"must": "MUST", "should": "RECOMMENDED", "nice": "OPTIONAL"}[page["priority"]]
+        lines.append(f"- **{page['name']}** [{priority_tag}] — {page['purpose']}")
+
+    lines.append("\n### Suggested Features")
+    lines.append("Present these as YOUR recommendation. Group by priority:")
+    for feat in niche["suggested_features"]:
+        priority_tag = {"must": "ESSENTIAL", "should": "RECOMMENDED", "nice": "OPTIONAL"}[feat["priority"]]
+        lines.append(f"- **{feat['name']}** [{priority_tag}] (complexity: {feat['complexity']})")
+
+    lines.append("\n### Key Questions for This Niche")
+    lines.append("These are the MOST VALUABLE questions for this business type. Prioritize these:")
+    for q in niche["key_questions"]:
+        lines.append(f"- {q}")
+
+    lines.append("\n### Design Direction Hints")
+    hints = niche["design_hints"]
+    lines.append(f"- Mood: {hints['mood']}")
+    lines.append(f"- Colors: {hints['colors']}")
+    lines.append(f"- Typography: {hints['typography']}")
+    lines.append(f"- Key element: {hints['key_element']}")
+    lines.append(f"- Imagery: {hints['imagery']}")
+
+    lines.append("\n### Admin Needs for This Type")
+    for need in niche["admin_needs"]:
+        lines.append(f"- {need}")
+
+    lines.append("\n### Common Integrations")
+    lines.append(", ".join(niche["common_integrations"]))
+
+    lines.append("\n### SEO Focus")
+    for seo in niche["seo_focus"]:
+        lines.append(f"- {seo}")
+
+    return "\n".join(lines)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_knowledge_base(
+    rules_path: str = settings.RULES_FILE,
+    niches_path: str = settings.NICHE_TEMPLATES_FILE,
+) -> KnowledgeBase:
+    """Read both JSON files and pre-render everything derived from them."""
+    rules_mtime = os.stat(rules_path).st_mtime
+    niches_mtime = os.stat(niches_path).st_mtime
+    rules = _read_json(rules_path)
+    templates = _read_json(niches_path)
+    niches = templates["niches"]
+
+    static_parts = [RULES_HEADER]
+    for cat_data in rules["categories"].values():
+        static_parts.append(render_category_block(cat_data))
+        static_parts.append("")
+    static_parts.append(render_meta_rules(rules["meta_rules"]))
+
+    return KnowledgeBase(
+        static_rules_markdown="\n".join(static_parts),
+        niche_contexts=MappingProxyType({
+            key: render_niche_context(niche) for key, niche in niches.items()
+        }),
+        niche_labels=MappingProxyType({
+            key: niche["label"] for key, niche in niches.items()
+        }),
+        niche_matcher=NicheMatcher(niches),
+        rules_mtime=rules_mtime,
+        niches_mtime=niches_mtime,
+    )
+
+
+_current: KnowledgeBase | None = None
+_watcher: asyncio.Task | None = None
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the current snapshot, loading it on first use."""
+    global _current
+    if _current is None:
+        _current = load_knowledge_base()
+    return _current
+
+
+def reload_if_changed() -> bool:
+    """Swap in a fresh snapshot if either source file changed on disk."""
+    global _current
+    kb = get_knowledge_base()
+    try:
+        rules_mtime = os.stat(settings.RULES_FILE).st_mtime
+        niches_mtime = os.stat(settings.NICHE_TEMPLATES_FILE).st_mtime
+        if rules_mtime == kb.rules_mtime and niches_mtime == kb.niches_mtime:
+            return False
+        _current = load_knowledge_base()
+    except (OSError, ValueError, KeyError):
+        # A half-written file shouldn't take the service down — keep serving
+        # the previous snapshot and retry on the next tick.
+        logger.exception("Knowledge base reload failed, keeping previous snapshot")
+        return False
+    logger.info("Knowledge base reloaded")
+    return True
+
+
+async def _watch(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(reload_if_changed)
+
+
+async def start_knowledge_base():
+    """Load the snapshot off the event loop and start the mtime watcher."""
+    global _current, _watcher
+    _current = await asyncio.to_thread(load_knowledge_base)
+    if _watcher is None and settings.KNOWLEDGE_RELOAD_INTERVAL > 0:
+        _watcher = asyncio.create_task(_watch(settings.KNOWLEDGE_RELOAD_INTERVAL))
+
+
+async def stop_knowledge_base():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        try:
+            await _watcher
+        except asyncio.CancelledError:
+            pass
+        _watcher = None
@@ -0,0 +1,112 @@
+import re
+from dataclasses import dataclass
+from typing import Mapping
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+KEYWORD_WEIGHT = 1.0
+PHRASE_WEIGHT = 1.5
+DESCRIPTION_WEIGHT = 0.5
+
+# Description words that say nothing about the niche
+DESCRIPTION_STOPWORDS = frozenset({
+    "and", "or", "the", "for", "with", "etc", "including", "providing", "specific",
+    "individual", "established", "businesses", "business", "products", "services",
+    "online", "sites", "websites", "focused", "user", "users",
+})
+
+
+@dataclass(frozen=True)
+class NicheMatch:
+    niche: str
+    score: float
+    confidence: float  # 0.0 to 1.0
+    scores: dict[str, float]
+
+
+def _word_forms(word: str) -> set[str]:
+    """Cheap English inflections so 'bakeries' and 'selling' still hit their keyword."""
+    forms = {word, word + "s", word + "es", word + "ing", word + "ed", word + "er", word + "ers"}
+    if word.endswith("y") and len(word) > 2:
+        forms.add(word[:-1] + "ies")
+    if word.endswith("e"):
+        forms.update({word[:-1] + "ing", word + "d"})
+    return forms
+
+
+class NicheMatcher:
+    """
+    Keyword classifier compiled from niche_templates.json.
+
+    All keyword forms live in one hash table keyed by token (or token tuple for
+    phrases), so classifying a message is a single tokenizing pass plus one
+    dict lookup per token and phrase length — independent of how many
+    keywords the templates define. Tokens are whole words, which gives word
+    boundaries for free ('app' no longer matches inside 'happy').
+    """
+
+    def __init__(self, niches: Mapping[str, dict]):
+        weights: dict[tuple[str, ...], dict[str, float]] = {}
+
+        def add(term: tuple[str, ...], niche_key: str, weight: float):
+            per_niche = weights.setdefault(term, {})
+            per_niche[niche_key] = max(per_niche.get(niche_key, 0.0), weight)
+
+        for niche_key, niche in niches.items():
+            for keyword in niche.get("keywords", []):
+                words = tuple(TOKEN_RE.findall(keyword.lower()))
+                if not words:
+                    continue
+                if len(words) == 1:
+                    for form in _word_forms(words[0]):
+                        add((form,), niche_key, KEYWORD_WEIGHT)
+                else:
+                    add(words, niche_key, PHRASE_WEIGHT)
+
+            for word in TOKEN_RE.findall(niche.get("description", "").lower()):
+                if len(word) < 4 or word in DESCRIPTION_STOPWORDS:
+                    continue
+                add((word,), niche_key, DESCRIPTION_WEIGHT)
+
+        # A term shared by several niches is weaker evidence for each of them
+        self._terms: dict[tuple[str, ...], tuple[tuple[str, float], ...]] = {
+            term: tuple((key, w / len(per_niche)) for key, w in per_niche.items())
+            for term, per_niche in weights.items()
+        }
+        self._max_phrase = max((len(term) for term in self._terms), default=1)
+
+    def score(self, text: str) -> dict[str, float]:
+        tokens = TOKEN_RE.findall(text.lower())
+        terms = self._terms
+        max_phrase = self._max_phrase
+        scores: dict[str, float] = {}
+        seen: set[tuple[str, ...]] = set()
+        for i in range(len(tokens)):
+            for n in range(1, max_phrase + 1):
+                term = tuple(tokens[i:i + n]) if n > 1 else (tokens[i],)
+                if len(term) < n:
+                    break
+                hits = terms.get(term)
+                # Count each term once so a rambling message can't outvote a precise one
+                if hits is None or term in seen:
+                    continue
+                seen.add(term)
+                for niche_key, weight in hits:
+                    scores[niche_key] = scores.get(niche_key, 0.0) + weight
+        return scores
+
+    def classify(self, text: str) -> NicheMatch | None:
+        scores = self.score(text)
+        if not scores:
+            return None
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        # Share of the evidence won by the top niche, damped when there is
+        # little evidence at all: one stray keyword shouldn't read as certain.
+        confidence = (top / sum(scores.values())) * (top / (top + 1.0))
+        return NicheMatch(
+            niche=best,
+            score=round(top, 3),
+            confidence=round(confidence, 3),
+            scores={k: round(v, 3) for k, v in scores.items()},
+        )
@@ -0,0 +1,99 @@
+from html.parser import HTMLParser
+
+MAX_HEADINGS = 20
+MAX_LINKS = 30
+# Navigation and the main headings come early in the body; past this much of it, stop
+BODY_BUDGET_CHARS = 128 * 1024
+
+HEADING_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+class PageExtractor(HTMLParser):
+    """
+    Incremental extractor for the page summary the competitor analysis needs.
+
+    Fed chunk by chunk as the body streams in, so the caller can stop reading
+    as soon as `enough` is set instead of buffering the whole document: once
+    the head is closed and either the link quota is full or BODY_BUDGET_CHARS
+    of body have gone by.
+    Holds only the extracted fields plus the parser's small pending buffer.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: str | None = None
+        self.meta_description = ""
+        self.headings: list[str] = []
+        self.links: list[tuple[str, str]] = []
+        self.head_closed = False
+        self.body_chars = 0
+        self._title_parts: list[str] | None = None
+        self._heading_tag: str | None = None
+        self._heading_parts: list[str] = []
+        self._link_href: str | None = None
+        self._link_parts: list[str] = []
+
+    @property
+    def enough(self) -> bool:
+        return self.head_closed and (len(self.links) >= MAX_LINKS or self.body_chars >= BODY_BUDGET_CHARS)
+
+    def feed(self, data: str):
+        super().feed(data)
+        if self.head_closed:
+            self.body_chars += len(data)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None and self._title_parts is None:
+            self._title_parts = []
+        elif tag == "meta" and not self.meta_description:
+            attrs = dict(attrs)
+            if (attrs.get("name") or "").lower() == "description":
+                self.meta_description = (attrs.get("content") or "").strip()
+        elif tag == "body":
+            self.head_closed = True
+        elif tag in HEADING_TAGS and self._heading_tag is None and len(self.headings) < MAX_HEADINGS:
+            self._heading_tag = tag
+            self._heading_parts = []
+        elif tag == "a" and self._link_href is None and len(self.links) < MAX_LINKS:
+            href = dict(attrs).get("href")
+            if href:
+                self._link_href = href
+                self._link_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = _clean("".join(self._title_parts))
+            self._title_parts = None
+        elif tag == "head":
+            self.head_closed = True
+        elif tag == self._heading_tag:
+            self.headings.append(_clean("".join(self._heading_parts)))
+            self._heading_tag = None
+        elif tag == "a" and self._link_href is not None:
+            self.links.append((self._link_href, _clean("".join(self._link_parts))))
+            self._link_href = None
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        if self._heading_tag is not None:
+            self._heading_parts.append(data)
+        if self._link_href is not None:
+            self._link_parts.append(data)
+
+    def result(self, content_length: int) -> dict:
+        return {
+            "title": self.title or "No title",
+            "meta_description": self.meta_description,
+            "headings": self.headings,
+            "navigation_links": [
+                {"href": href, "text": text}
+                for href, text in self.links
+                if text and not href.startswith("#") and not href.startswith("javascript:")
+            ],
+            "content_length": content_length,
+        }
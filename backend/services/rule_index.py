@@ -0,0 +1,170 @@
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from database.db import connection
+from services.rule_text import similarity, terms
+
+# Context terms (niche, open sections) count this much next to a message term
+CONTEXT_WEIGHT = 0.3
+# How much a rule's usage lifts its relevance score: 1 + USAGE_WEIGHT * ln(1 + times applied)
+USAGE_WEIGHT = 0.1
+
+
+@dataclass
+class RuleIndexStats:
+    searches: int = 0
+    search_us: float = 0.0
+
+    def as_dict(self, index: "RuleIndex") -> dict:
+        return {
+            "rules": len(index),
+            "terms": index.vocabulary_size,
+            "searches": self.searches,
+            "avg_search_us": round(self.search_us / self.searches, 1) if self.searches else 0.0,
+        }
+
+
+@dataclass
+class IndexedRule:
+    id: int
+    category: str
+    rule_text: str
+    # Terms of the rule text alone, for duplicate detection
+    terms: frozenset[str]
+    # Length of the indexed document (text plus category), for BM25
+    length: int
+    times_applied: int = 0
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "category": self.category, "rule_text": self.rule_text}
+
+
+class RuleIndex:
+    """
+    In-memory BM25 index over active learned rules. Documents are the rule
+    text plus its category; rules are added as they are learned, so the
+    index never needs a rebuild while the process runs.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._rules: dict[int, IndexedRule] = {}
+        self._by_category: dict[str, set[int]] = {}
+        self._postings: dict[str, dict[int, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __contains__(self, rule_id: int) -> bool:
+        return rule_id in self._rules
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def add(self, rule_id: int, category: str, rule_text: str, times_applied: int = 0):
+        """Index a rule; a rule already indexed (e.g. one a duplicate was merged into) is left alone."""
+        if rule_id in self._rules:
+            return
+        doc_terms = terms(f"{category} {rule_text}")
+        self._rules[rule_id] = IndexedRule(
+            rule_id, category, rule_text, frozenset(terms(rule_text)), len(doc_terms), times_applied,
+        )
+        self._by_category.setdefault(category, set()).add(rule_id)
+        self._total_length += len(doc_terms)
+        for term, tf in Counter(doc_terms).items():
+            self._postings.setdefault(term, {})[rule_id] = tf
+
+    def remove(self, rule_id: int):
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return
+        self._by_category[rule.category].discard(rule_id)
+        self._total_length -= rule.length
+        for term in set(terms(f"{rule.category} {rule.rule_text}")):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(rule_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def clear(self):
+        self._rules.clear()
+        self._by_category.clear()
+        self._postings.clear()
+        self._total_length = 0
+
+    def record_usage(self, rule_ids: list[int]):
+        for rule_id in rule_ids:
+            rule = self._rules.get(rule_id)
+            if rule is not None:
+                rule.times_applied += 1
+
+    def most_similar(self, category: str, rule_terms: frozenset[str]) -> tuple[int | None, float]:
+        """The indexed rule of `category` closest to `rule_terms`, and its similarity."""
+        best_id, best = None, 0.0
+        for rule_id in self._by_category.get(category, ()):
+            score = similarity(rule_terms, self._rules[rule_id].terms)
+            if score > best:
+                best_id, best = rule_id, score
+        return best_id, best
+
+    def search(self, query: str, limit: int, per_category: int, context: str = "") -> list[dict]:
+        """
+        The `limit` best-scoring rules for `query`, at most `per_category`
+        from any one category. Terms of `context` only weigh CONTEXT_WEIGHT,
+        so they steer the ranking without drowning out the message; usage
+        breaks ties and nudges close calls towards rules that proved useful.
+        """
+        started = time.perf_counter()
+        count = len(self._rules)
+        scores: dict[int, float] = {}
+        if count:
+            weights = dict.fromkeys(terms(context), CONTEXT_WEIGHT)
+            weights.update(dict.fromkeys(terms(query), 1.0))
+            average_length = self._total_length / count or 1
+            for term, weight in weights.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for rule_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._rules[rule_id].length / average_length)
+                    scores[rule_id] = scores.get(rule_id, 0.0) + weight * idf * tf * (self.k1 + 1) / (tf + norm)
+            for rule_id in scores:
+                scores[rule_id] *= 1 + USAGE_WEIGHT * math.log1p(self._rules[rule_id].times_applied)
+
+        results, taken = [], Counter()
+        ranked = sorted(scores, key=lambda rule_id: (-scores[rule_id], -self._rules[rule_id].times_applied, rule_id))
+        for rule_id in ranked:
+            rule = self._rules[rule_id]
+            if taken[rule.category] >= per_category:
+                continue
+            taken[rule.category] += 1
+            results.append(rule.as_dict())
+            if len(results) >= limit:
+                break
+
+        stats.searches += 1
+        stats.search_us += (time.perf_counter() - started) * 1_000_000
+        return results
+
+
+stats = RuleIndexStats()
+index = RuleIndex()
+
+
+async def start_rule_index():
+    """Build the index from the active rules in the database."""
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT id, category, rule_text, times_applied FROM learned_rules WHERE active = 1"
+        )
+        rows = await cursor.fetchall()
+    index.clear()
+    for row in rows:
+        index.add(row["id"], row["category"], row["rule_text"], row["times_applied"] or 0)
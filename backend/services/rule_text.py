@@ -0,0 +1,48 @@
+import re
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+# Words that say nothing about what a rule is about (EN + RU)
+_STOPWORDS = frozenset("""
+a an the and or but if then than that this these those there their they them it its
+is are was were be been being do does did have has had will would should could can may
+might must to of in on at by for from with about into over under as so not no yes
+also very just more most some any all each every other such what which who whom when
+where why how you your yours we our us he she his her i me my
+always never ask asking make sure consider
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+только ее мне было вот от меня еще нет о из ему теперь когда даже ну ли если уже
+или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может
+они тут где есть надо ней для мы тебя их чем была сам чтобы без будто чего раз тоже
+себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+почти мой тем нее сейчас были куда зачем всех никогда можно при наконец два об
+другой хоть после над больше тот через эти нас про всего них какая много разве три эту
+моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда
+конечно всю между спросить уточнить
+""".split())
+
+# Crude language-agnostic stemming: words sharing a prefix this long match
+_STEM_LENGTH = 6
+
+
+def terms(text: str) -> list[str]:
+    """Content words of `text`, lower-cased, stop words dropped, prefix-stemmed."""
+    return [
+        word[:_STEM_LENGTH]
+        for word in (match.lower() for match in _WORD.findall(text))
+        if len(word) > 2 and word not in _STOPWORDS
+    ]
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    """Jaccard similarity of two term sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def coverage(rule: frozenset[str], text: frozenset[str]) -> float:
+    """Share of a rule's terms that also appear in `text`."""
+    if not rule:
+        return 0.0
+    return len(rule & text) / len(rule)
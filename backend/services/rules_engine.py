@@ -1,80 +1,95 @@
-import json
-import os
-import aiosqlite
-from config import settings
-from database.db import DB_PATH
-
-
-def load_base_rules() -> dict:
-    with open(settings.RULES_FILE, "r") as f:
-        return json.load(f)
+from dataclasses import dataclass
 
+import aiosqlite
 
-async def get_active_learned_rules() -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT category, rule_text, times_applied FROM learned_rules WHERE active = 1 ORDER BY times_applied DESC"
-        )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+from config import settings
+from services import rule_index
+from services.knowledge_base import get_knowledge_base
+from services.rule_text import coverage, terms
 
 
-async def get_full_rules_context() -> str:
-    """Build the complete rules context for the AI engine — base rules + learned rules merged."""
-    base = load_base_rules()
-    learned = await get_active_learned_rules()
+# Open sections whose labels are added to the rules query
+RULES_CONTEXT_SECTIONS = 3
 
-    lines = []
-    lines.append("## BRAINSTORMING RULES & QUESTION BANK\n")
+LEARNED_RULES_HEADER = "## LEARNED FROM PAST SESSIONS\n\nRules from earlier sessions that bear on this message:\n"
 
-    for cat_key, cat_data in base["categories"].items():
-        lines.append(f"### {cat_data['label']}")
-        lines.append("**Questions to consider:**")
-        for q in cat_data["base_questions"]:
-            lines.append(f"- {q}")
 
-        lines.append("**Thinking rules:**")
-        for r in cat_data["thinking_rules"]:
-            lines.append(f"- {r}")
+@dataclass
+class RulesContext:
+    # Base rules and question bank — the same every turn, so it stays cached
+    text: str
+    # Learned rules retrieved for this turn
+    learned: list[dict]
 
-        # Append learned rules for this category
-        cat_learned = [r for r in learned if r["category"] == cat_key]
-        if cat_learned:
-            lines.append("**Learned from past sessions:**")
-            for r in cat_learned:
-                lines.append(f"- {r['rule_text']} (applied {r['times_applied']}x)")
+    @property
+    def learned_markdown(self) -> str:
+        if not self.learned:
+            return ""
+        return LEARNED_RULES_HEADER + "\n".join(
+            f"- ({r['category']}) {r['rule_text']}" for r in self.learned
+        )
 
-        lines.append("")
 
-    lines.append("### Meta Rules")
-    for section_key, rules in base["meta_rules"].items():
-        lines.append(f"**{section_key.replace('_', ' ').title()}:**")
-        for r in rules:
-            lines.append(f"- {r}")
-        lines.append("")
+def get_rules_context(message: str, niche_type: str | None = None, open_sections: list[str] = ()) -> RulesContext:
+    """
+    Rules context for one turn: the base rules, plus the learned rules most
+    relevant to the message — looked up in the in-memory index, no database
+    round trip. The session's niche and the first few whitepaper sections
+    still to be filled only steer the ranking, so the message stays what
+    decides it.
+    """
+    kb = get_knowledge_base()
+    context = list(open_sections[:RULES_CONTEXT_SECTIONS])
+    if niche_type:
+        context.insert(0, kb.niche_labels.get(niche_type, niche_type))
+    learned = rule_index.index.search(
+        message, settings.LEARNED_RULES_TOP_N, settings.RULES_PER_CATEGORY, context=" ".join(context)
+    )
+    return RulesContext(kb.static_rules_markdown, learned)
+
+
+async def insert_learned_rule(
+    db: aiosqlite.Connection, category: str, rule_text: str, source_session_id: str | None = None
+) -> tuple[int, bool]:
+    """
+    Insert a learned rule on a connection already inside a write transaction,
+    or merge it into an active rule of the same category that says nearly the
+    same thing, as found in the rule index. A new rule is indexed straight
+    away so later rules in the same batch dedupe against it; callers remove
+    it again if the transaction fails. Returns the id of the rule that holds
+    it and whether that rule was created.
+    """
+    best_id, best = rule_index.index.most_similar(category, frozenset(terms(rule_text)))
+    if best_id is not None and best >= settings.RULE_MERGE_THRESHOLD:
+        await db.execute(
+            "UPDATE learned_rules SET times_merged = times_merged + 1 WHERE id = ?", (best_id,)
+        )
+        return best_id, False
 
-    return "\n".join(lines)
+    cursor = await db.execute(
+        "INSERT INTO learned_rules (category, rule_text, source_session_id) VALUES (?, ?, ?)",
+        (category, rule_text, source_session_id),
+    )
+    rule_index.index.add(cursor.lastrowid, category, rule_text)
+    return cursor.lastrowid, True
 
 
-async def add_learned_rule(category: str, rule_text: str, source_session_id: str | None = None):
-    """Add a new learned rule discovered during a brainstorming session."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            "INSERT INTO learned_rules (category, rule_text, source_session_id) VALUES (?, ?, ?)",
-            (category, rule_text, source_session_id),
-        )
-        await db.commit()
+def applied_rules(learned: list[dict], response_text: str) -> list[int]:
+    """Ids of the prompted learned rules whose substance shows up in the response."""
+    response_terms = frozenset(terms(response_text))
+    return [
+        r["id"] for r in learned
+        if coverage(frozenset(terms(r["rule_text"])), response_terms) >= settings.RULE_APPLIED_COVERAGE
+    ]
 
 
-async def increment_rule_usage(rule_id: int):
-    """Track that a learned rule was useful in a session."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+async def record_rule_usage(db: aiosqlite.Connection, rule_ids: list[int]):
+    """Count one application of each rule, as one batch in the caller's transaction."""
+    if rule_ids:
+        await db.executemany(
             "UPDATE learned_rules SET times_applied = times_applied + 1 WHERE id = ?",
-            (rule_id,),
+            [(rule_id,) for rule_id in rule_ids],
         )
-        await db.commit()
 
 
 RULE_EXTRACTION_PROMPT = """
@@ -0,0 +1,229 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from config import settings
+from database.db import connection
+from services import whitepaper_store, write_behind
+from services.context_window import ConversationWindow
+
+
+@dataclass
+class SessionCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "sessions": len(_entries),
+            "bytes": _total_bytes,
+        }
+
+
+@dataclass
+class SessionContext:
+    """Everything a brainstorm turn needs about its session before calling the model."""
+
+    niche_type: str | None = None
+    current_phase: int = 1
+    whitepaper: dict = field(default_factory=dict)
+    window: ConversationWindow = field(default_factory=ConversationWindow)
+    size: int = 0
+
+    def measure(self) -> int:
+        """Approximate footprint: the text it holds, which dominates everything else."""
+        self.size = (
+            sum(len(str(v)) for v in self.whitepaper.values())
+            + len(self.window.summary)
+            + sum(len(t["cleaned_text"] or "") for t in self.window.turns)
+        )
+        return self.size
+
+    def window_before(self, turn_id: int) -> ConversationWindow:
+        """The window as it was before `turn_id` — the turn being answered isn't history yet."""
+        return ConversationWindow(
+            summary=self.window.summary,
+            covered_through_id=self.window.covered_through_id,
+            turns_covered=self.window.turns_covered,
+            turns=[t for t in self.window.turns if t["id"] < turn_id],
+        )
+
+
+stats = SessionCacheStats()
+
+_entries: "OrderedDict[str, SessionContext]" = OrderedDict()
+_total_bytes = 0
+
+
+@dataclass
+class _Load:
+    """A load shared by every concurrent miss on one session."""
+
+    task: asyncio.Task
+    # Bumped by every write while the load runs; a load that saw one may be stale
+    generation: int = 0
+
+
+_loading: dict[str, _Load] = {}
+
+
+def _put(session_id: str, ctx: SessionContext):
+    global _total_bytes
+    old = _entries.pop(session_id, None)
+    if old is not None:
+        _total_bytes -= old.size
+    _entries[session_id] = ctx
+    _total_bytes += ctx.measure()
+    _evict()
+
+
+def _evict():
+    """Drop least-recently-used sessions until the cache is within both limits."""
+    global _total_bytes
+    while _entries and (
+        len(_entries) > settings.SESSION_CACHE_SIZE or _total_bytes > settings.SESSION_CACHE_MAX_BYTES
+    ):
+        evicted_id, evicted = _entries.popitem(last=False)
+        _total_bytes -= evicted.size
+        stats.evictions += 1
+
+
+def _written(session_id: str) -> SessionContext | None:
+    load = _loading.get(session_id)
+    if load is not None:
+        load.generation += 1
+    return _entries.get(session_id)
+
+
+def _resized(session_id: str, ctx: SessionContext):
+    global _total_bytes
+    _total_bytes -= ctx.size
+    _total_bytes += ctx.measure()
+    _entries.move_to_end(session_id)
+    _evict()
+
+
+async def _load(session_id: str) -> SessionContext:
+    ctx = SessionContext()
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT niche_type, current_phase FROM sessions WHERE id = ?", (session_id,)
+        )
+        row = await cursor.fetchone()
+        if row:
+            ctx.niche_type = row["niche_type"] or None
+            ctx.current_phase = row["current_phase"] or 1
+
+        ctx.whitepaper = await whitepaper_store.read_sections(db, session_id)
+
+        cursor = await db.execute(
+            "SELECT summary, covered_through_id, turns_covered FROM conversation_summaries WHERE session_id = ?",
+            (session_id,),
+        )
+        row = await cursor.fetchone()
+        if row:
+            ctx.window.summary = row["summary"]
+            ctx.window.covered_through_id = row["covered_through_id"]
+            ctx.window.turns_covered = row["turns_covered"]
+
+        cursor = await db.execute(
+            """SELECT id, role, cleaned_text FROM conversation_turns
+            WHERE session_id = ? AND id > ?
+            ORDER BY created_at, id""",
+            (session_id, ctx.window.covered_through_id),
+        )
+        ctx.window.turns = [dict(r) for r in await cursor.fetchall()]
+    return ctx
+
+
+async def get(session_id: str) -> SessionContext:
+    """Cached context for a session, loaded in one pass on a miss."""
+    # The last turn's results may still be on their way to the database
+    await write_behind.settled(session_id)
+    ctx = _entries.get(session_id)
+    if ctx is not None:
+        stats.hits += 1
+        _entries.move_to_end(session_id)
+        return ctx
+
+    stats.misses += 1
+    load = _loading.get(session_id)
+    if load is None:
+        load = _loading[session_id] = _Load(asyncio.ensure_future(_load(session_id)))
+
+        def loaded(task: asyncio.Task):
+            if _loading.get(session_id) is load:
+                del _loading[session_id]
+            # Cache only what no write or invalidation raced with
+            if not task.cancelled() and task.exception() is None and load.generation == 0 \
+                    and session_id not in _entries:
+                _put(session_id, task.result())
+
+        load.task.add_done_callback(loaded)
+    # One caller going away must not cancel the load the others are waiting on
+    return await asyncio.shield(load.task)
+
+
+# Write-through hooks — call after the database write has committed. Sessions
+# that aren't cached are left alone; they load fresh on their next turn.
+
+def prime(session_id: str):
+    """A new session: cache its (empty) context so the first turn needs no reads."""
+    _put(session_id, SessionContext())
+
+
+def set_niche(session_id: str, niche_type: str):
+    ctx = _written(session_id)
+    if ctx is not None:
+        ctx.niche_type = niche_type
+        _resized(session_id, ctx)
+
+
+def set_phase(session_id: str, phase: int):
+    ctx = _written(session_id)
+    if ctx is not None:
+        ctx.current_phase = phase
+        _resized(session_id, ctx)
+
+
+def update_whitepaper(session_id: str, updates: dict):
+    ctx = _written(session_id)
+    if ctx is not None:
+        ctx.whitepaper.update(
+            (key, whitepaper_store.section_text(value)) for key, value in updates.items()
+        )
+        _resized(session_id, ctx)
+
+
+def append_turn(session_id: str, turn_id: int, role: str, cleaned_text: str):
+    ctx = _written(session_id)
+    if ctx is not None:
+        ctx.window.turns.append({"id": turn_id, "role": role, "cleaned_text": cleaned_text})
+        _resized(session_id, ctx)
+
+
+def set_summary(session_id: str, summary: str, covered_through_id: int, turns_covered: int):
+    ctx = _written(session_id)
+    if ctx is not None:
+        ctx.window.summary = summary
+        ctx.window.covered_through_id = covered_through_id
+        ctx.window.turns_covered = turns_covered
+        ctx.window.turns = [t for t in ctx.window.turns if t["id"] > covered_through_id]
+        _resized(session_id, ctx)
+
+
+def invalidate(session_id: str):
+    global _total_bytes
+    _written(session_id)
+    ctx = _entries.pop(session_id, None)
+    if ctx is not None:
+        _total_bytes -= ctx.size
+        stats.invalidations += 1
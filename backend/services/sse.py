@@ -0,0 +1,109 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator
+
+from config import settings
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def parse_sse_event(frame: str) -> tuple[str, Any]:
+    """Inverse of `sse_event`: the event name and decoded data of one frame."""
+    event, data = "message", None
+    for line in frame.splitlines():
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event, data
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class ResponseBuffer:
+    """
+    Accumulates streamed model text as a list of chunks joined once at the
+    end, instead of re-allocating the whole string on every token. Enforces a
+    per-stream memory ceiling.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._parts: list[str] = []
+        self._joined: str | None = None
+
+    def append(self, text: str):
+        self.size += len(text.encode())
+        if self.size > self.max_bytes:
+            raise ResponseTooLarge(f"Model response exceeded {self.max_bytes} bytes")
+        self._parts.append(text)
+        self._joined = None
+
+    def getvalue(self) -> str:
+        if self._joined is None:
+            self._joined = "".join(self._parts)
+            self._parts = [self._joined]
+        return self._joined
+
+
+async def coalesce(
+    chunks: AsyncIterator[str], max_bytes: int, window: float
+) -> AsyncIterator[str]:
+    """
+    Merge small text chunks into larger ones.
+
+    A merged chunk is released once it reaches `max_bytes` or once `window`
+    seconds have passed since its first piece arrived — even if the source
+    goes quiet, so a stalled model never holds text back longer than the
+    window. A window of 0 passes chunks through unchanged.
+    """
+    if window <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    source = chunks.__aiter__()
+    buffer: list[str] = []
+    size = 0
+    deadline: float | None = None
+    next_chunk = asyncio.ensure_future(source.__anext__())
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+            if not done:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                break
+            next_chunk = asyncio.ensure_future(source.__anext__())
+
+            buffer.append(chunk)
+            size += len(chunk.encode())
+            if deadline is None:
+                deadline = loop.time() + window
+            if size >= max_bytes:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if not next_chunk.done():
+            next_chunk.cancel()
+
+
+def coalesce_tokens(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Coalesce model tokens using the configured SSE flush threshold and window."""
+    return coalesce(chunks, settings.SSE_COALESCE_BYTES, settings.SSE_COALESCE_WINDOW)
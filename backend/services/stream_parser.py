@@ -0,0 +1,89 @@
+from typing import Iterable
+
+
+class TagStreamParser:
+    """
+    Incremental parser for the XML-style sections in a model response.
+
+    Fed each token chunk as it arrives; `feed` returns every section whose
+    closing tag has just been seen, so callers can act on it immediately.
+    Tags split across chunks are handled by keeping a short unconsumed tail
+    (never longer than the longest tag), so the whole response is scanned
+    once in total. As with a non-greedy regex, the first occurrence of each
+    section wins and a section that never closes is never emitted.
+    Call `close` when the stream ends.
+    """
+
+    def __init__(self, tags: Iterable[str]):
+        self._open_tags = {f"<{tag}>": tag for tag in tags}
+        self._max_open_len = max(len(t) for t in self._open_tags)
+        self._tail = ""
+        self._current: str | None = None
+        self._close_tag = ""
+        self._parts: list[str] = []
+        self.sections: dict[str, str] = {}
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        completed: list[tuple[str, str]] = []
+        buf = self._tail + chunk
+        pos = 0
+        end_of_buf = len(buf)
+
+        while pos < end_of_buf:
+            if self._current is None:
+                start = buf.find("<", pos)
+                if start == -1:
+                    pos = end_of_buf
+                    break
+                close = buf.find(">", start, start + self._max_open_len)
+                if close == -1:
+                    if start + self._max_open_len > end_of_buf:
+                        # Could be the front half of an opening tag — wait for more
+                        pos = start
+                        break
+                    pos = start + 1
+                    continue
+                tag = self._open_tags.get(buf[start:close + 1])
+                if tag is None or tag in self.sections:
+                    pos = start + 1
+                    continue
+                self._current = tag
+                self._close_tag = f"</{tag}>"
+                self._parts = []
+                pos = close + 1
+            else:
+                end = buf.find(self._close_tag, pos)
+                if end == -1:
+                    # Keep just enough to recognise a closing tag split across chunks
+                    safe = max(pos, end_of_buf - (len(self._close_tag) - 1))
+                    self._parts.append(buf[pos:safe])
+                    pos = safe
+                    break
+                self._parts.append(buf[pos:end])
+                content = "".join(self._parts).strip()
+                self.sections[self._current] = content
+                completed.append((self._current, content))
+                self._current = None
+                self._parts = []
+                pos = end + len(self._close_tag)
+
+        self._tail = buf[pos:]
+        return completed
+
+    def close(self) -> list[tuple[str, str]]:
+        """
+        Finish the stream. If a section was opened but never closed, rescan
+        what followed its opening tag so sections after it are not lost.
+        """
+        completed: list[tuple[str, str]] = []
+        while self._current is not None:
+            rest = "".join(self._parts) + self._tail
+            self._current = None
+            self._parts = []
+            self._tail = ""
+            completed.extend(self.feed(rest))
+        self._tail = ""
+        return completed
+
+    def get(self, tag: str) -> str | None:
+        return self.sections.get(tag)
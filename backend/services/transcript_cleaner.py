@@ -0,0 +1,127 @@
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+# Hesitation sounds that never carry meaning (EN + RU)
+_PURE_FILLERS = re.compile(
+    r"(?:,\s*)?(?<!\w)(?:u+h+m*|u+m+|e+r+m*|h+m+|m{2,}|a{2,}h*|ah|"
+    r"э+|э+м+|м{2,}|х+м+|а{2,})(?!\w),?",
+    re.IGNORECASE,
+)
+
+# Words that are often filler but sometimes meaningful — left in place; a
+# transcript full of them is handed to the model instead
+_SOFT_FILLERS = re.compile(
+    r"(?<!\w)(?:like|you know|i mean|basically|actually|sort of|kind of|"
+    r"ну|как бы|типа|короче|вот|значит|это самое|в общем)(?!\w)",
+    re.IGNORECASE,
+)
+
+# "w-want", "wa-wa-want" -> "want"; a single longer fragment ("re-read") is a real word
+_STUTTER = re.compile(r"(?<!\w)(?:(\w)-(?:\1-)*|(\w{2,3})-\2-(?:\2-)*)(?=(?:\1|\2)\w)", re.IGNORECASE)
+# "I I want", "I want I want" -> "I want"
+_REPEATED_WORD = re.compile(r"(?<!\w)(\w+)((?:[\s,]+\1)+)(?!\w)", re.IGNORECASE)
+_REPEATED_PAIR = re.compile(r"(?<!\w)(\w+\s+\w+)(?:[\s,]+\1)+(?!\w)", re.IGNORECASE)
+# Words that are grammatical said twice ("I had had enough", "so that that works")
+_VALID_DOUBLES = frozenset("""
+had that is do did very really so no yes bye many much far more long again
+что так очень да нет ну вот
+""".split())
+
+# Addresses, domains, abbreviations and hyphenated words ("etsy.com", "U.S.",
+# "e.g.", "bob@mail.ru", "re-read") pass through exactly as dictated
+_PROTECTED = re.compile(r"[^\s,;:!?]*\w[.@-]\w[^\s,;:!?]*|(?<!\w)\w\.(?=\w\.)")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+_SPACE_BEFORE_PUNCT = re.compile(r"\s+([,.;:!?])")
+_REPEATED_PUNCT = re.compile(r"([,;:])(?:\s*[,;:])+|,\s*([.!?])")
+_MISSING_SPACE_AFTER = re.compile(r"([,;:!?.])(?=[^\W\d_])")
+_SENTENCE_START = re.compile(r"(^|[.!?]\s+)([^\W\d_])")
+_LONE_I = re.compile(r"(?<!\w)i(?=\s|'|$)")
+_MIXED_SCRIPT = re.compile(r"(?=\w*[a-zA-Z])(?=\w*[а-яА-ЯёЁ])\w+")
+_SENTENCE_END = re.compile(r"[.!?]")
+
+# Unpunctuated dictation longer than this needs the model to find sentences
+_MAX_UNPUNCTUATED_WORDS = 25
+
+
+@dataclass
+class CleanedTranscript:
+    text: str
+    # 0..1 — how confident we are the local clean-up is as good as the model's
+    score: float
+
+
+def _tidy(text: str) -> str:
+    text = " ".join(text.split())
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _REPEATED_PUNCT.sub(lambda m: m.group(2) or m.group(1), text)
+    text = _MISSING_SPACE_AFTER.sub(r"\1 ", text)
+    return text.strip(" ,;:")
+
+
+def _collapse_repeat(match: re.Match) -> str:
+    word, repeats = match.group(1), match.group(2)
+    # A grammatical double stays; three or more of anything is a stutter
+    if word.lower() in _VALID_DOUBLES and len(re.findall(r"\w+", repeats)) == 1:
+        return match.group(0)
+    return word
+
+
+def clean_locally(raw: str) -> CleanedTranscript:
+    """
+    Rule-based transcript clean-up: drop hesitation sounds, collapse
+    stutters and repeated words, normalise spacing and punctuation, and
+    capitalise sentences. The score drops for what rules can't fix —
+    ambiguous fillers, long unpunctuated runs, mixed-script words and heavy
+    noise — so the caller knows when to fall back to the model.
+    """
+    words_before = len(raw.split())
+    if not words_before:
+        return CleanedTranscript(raw.strip(), 1.0)
+
+    text = _STUTTER.sub("", raw)
+
+    # Step 1: Set tokens with dots, @ and hyphens aside so no rule below can split or recase them
+    protected: list[str] = []
+
+    def protect(match: re.Match) -> str:
+        protected.append(match.group(0))
+        return f"\x00{len(protected) - 1}\x00"
+
+    text = _PROTECTED.sub(protect, text)
+
+    # Step 2: Fillers and repeats
+    text = _PURE_FILLERS.sub(" ", text)
+    baseline = _tidy(text)
+    text = _REPEATED_PAIR.sub(r"\1", text)
+    text = _REPEATED_WORD.sub(_collapse_repeat, text)
+    text = _tidy(text)
+
+    # Step 3: Casing and the closing full stop
+    if _LONE_I.search(text) and re.search(r"[a-zA-Z]", text):
+        text = _LONE_I.sub("I", text)
+    text = _SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+    if text and text[-1].isalnum():
+        text += "."
+
+    text = _PLACEHOLDER.sub(lambda m: protected[int(m.group(1))], text)
+    baseline = _PLACEHOLDER.sub(lambda m: protected[int(m.group(1))], baseline)
+
+    words = text.split()
+    if not words:
+        return CleanedTranscript(text, 0.0)
+
+    score = 1.0
+    score -= min(0.5, len(_SOFT_FILLERS.findall(text)) / len(words))
+    score -= min(0.4, 2 * len(_MIXED_SCRIPT.findall(text)) / len(words))
+    removed = 1 - len(words) / words_before
+    if removed > 0.3:
+        score -= removed - 0.3
+    # Beyond dropping fillers, tidying should only touch spacing, casing and punctuation
+    kept = SequenceMatcher(None, baseline.lower(), text.lower()).ratio()
+    if kept < 0.75:
+        score -= 2 * (0.75 - kept)
+    if len(words) > _MAX_UNPUNCTUATED_WORDS and len(_SENTENCE_END.findall(raw)) < len(words) / _MAX_UNPUNCTUATED_WORDS:
+        score -= 0.4
+    return CleanedTranscript(text, round(max(0.0, score), 3))
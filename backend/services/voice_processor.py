@@ -1,14 +1,46 @@
-import anthropic
+from dataclasses import dataclass
+
 from config import settings
+from services.clients import get_anthropic
+from services.transcript_cleaner import clean_locally
 from prompts.voice_cleanup import VOICE_CLEANUP_PROMPT, VOICE_CLEANUP_SYSTEM
 
 
+@dataclass
+class CleanupStats:
+    fast_path: int = 0
+    model: int = 0
+
+    def as_dict(self) -> dict:
+        total = self.fast_path + self.model
+        return {
+            "fast_path": self.fast_path,
+            "model": self.model,
+            "fast_path_rate": round(self.fast_path / total, 3) if total else 0.0,
+        }
+
+
+stats = CleanupStats()
+
+
 async def clean_transcript(raw_transcript: str) -> str:
-    """Clean up a messy voice transcript into readable text."""
+    """
+    Clean up a messy voice transcript into readable text.
+
+    Rule-based clean-up runs first; the model is only called when its
+    quality score is below TRANSCRIPT_MIN_QUALITY.
+    """
     if not raw_transcript or len(raw_transcript.strip()) < 5:
         return raw_transcript
 
-    client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    if settings.TRANSCRIPT_FAST_PATH_ENABLED:
+        cleaned = clean_locally(raw_transcript)
+        if cleaned.text and cleaned.score >= settings.TRANSCRIPT_MIN_QUALITY:
+            stats.fast_path += 1
+            return cleaned.text
+
+    stats.model += 1
+    client = get_anthropic()
 
     response = await client.messages.create(
         model="claude-sonnet-4-20250514",
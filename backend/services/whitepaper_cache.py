@@ -0,0 +1,123 @@
+import hashlib
+import time
+from dataclasses import dataclass
+
+from config import settings
+from database.db import connection
+from database.writer import writer
+from prompts.whitepaper_prompt import WHITEPAPER_PROMPT_VERSION
+
+
+@dataclass
+class WhitepaperCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+@dataclass
+class GeneratedWhitepaper:
+    content_hash: str
+    markdown: str
+    model: str
+    created_at: float
+
+
+stats = WhitepaperCacheStats()
+
+
+def content_hash(whitepaper_data: str) -> str:
+    """Cache key: anything that changes the output changes the hash."""
+    key = "\0".join((settings.WHITEPAPER_MODEL, WHITEPAPER_PROMPT_VERSION, whitepaper_data))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+async def lookup(key: str) -> GeneratedWhitepaper | None:
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT markdown, model, created_at FROM generated_whitepapers WHERE content_hash = ?",
+            (key,),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        stats.misses += 1
+        return None
+    stats.hits += 1
+    return GeneratedWhitepaper(key, row["markdown"], row["model"], row["created_at"])
+
+
+async def latest(session_id: str) -> GeneratedWhitepaper | None:
+    """The last document generated for a session, if it hasn't been evicted."""
+    async with connection() as db:
+        cursor = await db.execute(
+            """SELECT g.content_hash, g.markdown, g.model, g.created_at
+            FROM whitepapers w JOIN generated_whitepapers g ON g.content_hash = w.generated_hash
+            WHERE w.session_id = ?""",
+            (session_id,),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    return GeneratedWhitepaper(row["content_hash"], row["markdown"], row["model"], row["created_at"])
+
+
+async def record(session_id: str, key: str, markdown: str | None = None):
+    """
+    Point the session at a generated document, storing the document first if
+    it is new, then evict least-recently-used documents over the size budget.
+    """
+    now = time.time()
+
+    async def op(db):
+        if markdown is None:
+            await db.execute(
+                "UPDATE generated_whitepapers SET accessed_at = ? WHERE content_hash = ?", (now, key)
+            )
+        else:
+            await db.execute(
+                """INSERT INTO generated_whitepapers (content_hash, model, markdown, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET
+                    markdown = excluded.markdown, size = excluded.size,
+                    created_at = excluded.created_at, accessed_at = excluded.accessed_at""",
+                (key, settings.WHITEPAPER_MODEL, markdown, len(markdown.encode()), now, now),
+            )
+        await db.execute(
+            "UPDATE whitepapers SET generated_hash = ? WHERE session_id = ?", (key, session_id)
+        )
+        if markdown is None:
+            return
+
+        cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM generated_whitepapers")
+        excess = (await cursor.fetchone())[0] - settings.WHITEPAPER_CACHE_MAX_BYTES
+        if excess <= 0:
+            return
+        # Never evict what was just stored
+        cursor = await db.execute(
+            "SELECT content_hash, size FROM generated_whitepapers WHERE content_hash <> ? ORDER BY accessed_at",
+            (key,),
+        )
+        victims = []
+        async for row in cursor:
+            if excess <= 0:
+                break
+            victims.append((row["content_hash"],))
+            excess -= row["size"]
+        await cursor.close()
+        await db.executemany("DELETE FROM generated_whitepapers WHERE content_hash = ?", victims)
+        stats.evictions += len(victims)
+
+    if markdown is not None:
+        stats.stores += 1
+    await writer.run(op)
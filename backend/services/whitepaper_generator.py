@@ -0,0 +1,154 @@
+import asyncio
+import json
+from typing import AsyncGenerator
+
+from config import settings
+from database.db import connection
+from services import whitepaper_cache, whitepaper_store, write_behind
+from services.clients import get_anthropic
+from services.sse import sse_event
+from prompts.whitepaper_prompt import (
+    WHITEPAPER_CHAPTERS,
+    WHITEPAPER_CHAPTER_PROMPT,
+    WHITEPAPER_CONTEXT_PROMPT,
+    WHITEPAPER_SYSTEM,
+)
+
+
+class WhitepaperNotFound(Exception):
+    pass
+
+
+async def load_whitepaper_data(session_id: str) -> str:
+    """The accumulated sections as the JSON the synthesis prompt expects."""
+    await write_behind.settled(session_id)
+    async with connection() as db:
+        cursor = await db.execute(
+            "SELECT 1 FROM whitepapers WHERE session_id = ?", (session_id,)
+        )
+        row = await cursor.fetchone()
+        sections = await whitepaper_store.read_sections(db, session_id)
+
+    if not row:
+        raise WhitepaperNotFound("No whitepaper data found for this session.")
+    return json.dumps(sections, ensure_ascii=False)
+
+
+def build_context_system(whitepaper_data: str) -> list[dict]:
+    """System blocks shared by every chapter call; the data block is the cached prefix."""
+    outline = "\n".join(
+        f"{number}. **{title}** — {brief}"
+        for number, (title, brief) in enumerate(WHITEPAPER_CHAPTERS, start=1)
+    )
+    context = {
+        "type": "text",
+        "text": WHITEPAPER_CONTEXT_PROMPT.format(whitepaper_data=whitepaper_data, outline=outline),
+    }
+    if settings.PROMPT_CACHING_ENABLED:
+        context["cache_control"] = {"type": "ephemeral"}
+    return [{"type": "text", "text": WHITEPAPER_SYSTEM}, context]
+
+
+async def generate_chapters(whitepaper_data: str) -> AsyncGenerator[tuple[int, str, dict], None]:
+    """
+    Generate every chapter as its own model call, at most
+    WHITEPAPER_PARALLELISM at a time, yielding (index, markdown, usage) in
+    completion order. With prompt caching on, the first call runs alone until
+    it starts answering so the rest read the shared context from the cache
+    instead of each writing it.
+    """
+    client = get_anthropic()
+    system = build_context_system(whitepaper_data)
+    limit = asyncio.Semaphore(settings.WHITEPAPER_PARALLELISM)
+    context_cached = asyncio.Event()
+    if not settings.PROMPT_CACHING_ENABLED:
+        context_cached.set()
+
+    async def write(index: int) -> tuple[int, str, dict]:
+        title, brief = WHITEPAPER_CHAPTERS[index]
+        if index > 0:
+            await context_cached.wait()
+        async with limit:
+            async with client.messages.stream(
+                model=settings.WHITEPAPER_MODEL,
+                max_tokens=settings.WHITEPAPER_CHAPTER_MAX_TOKENS,
+                system=system,
+                messages=[{
+                    "role": "user",
+                    "content": WHITEPAPER_CHAPTER_PROMPT.format(number=index + 1, title=title, brief=brief),
+                }],
+            ) as stream:
+                parts = []
+                async for text in stream.text_stream:
+                    context_cached.set()
+                    parts.append(text)
+                message = await stream.get_final_message()
+        context_cached.set()
+        usage = getattr(message, "usage", None)
+        return index, "".join(parts).strip(), {
+            "input_tokens": getattr(usage, "input_tokens", None) or 0,
+            "output_tokens": getattr(usage, "output_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+        }
+
+    tasks = [asyncio.create_task(write(index)) for index in range(len(WHITEPAPER_CHAPTERS))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # A failed chapter or a disconnected client stops the rest
+        for task in tasks:
+            task.cancel()
+
+
+def assemble(chapters: dict[int, str]) -> str:
+    return "\n\n".join(chapters[index] for index in sorted(chapters))
+
+
+async def stream_final_whitepaper(session_id: str, force: bool = False) -> AsyncGenerator[str, None]:
+    """
+    Generate the final whitepaper and stream it via SSE: each chapter as soon
+    as it is written, then the assembled document in order. A document
+    already generated from the same content is sent straight from the cache.
+    """
+    try:
+        try:
+            whitepaper_data = await load_whitepaper_data(session_id)
+        except WhitepaperNotFound as e:
+            yield sse_event("error", {"message": str(e), "code": "not_found"})
+            return
+
+        key = whitepaper_cache.content_hash(whitepaper_data)
+        cached = None if force else await whitepaper_cache.lookup(key)
+        if cached:
+            await whitepaper_cache.record(session_id, key)
+            yield sse_event("whitepaper", {"session_id": session_id, "whitepaper_markdown": cached.markdown, "cached": True})
+            yield sse_event("done", {"session_id": session_id})
+            return
+
+        total = len(WHITEPAPER_CHAPTERS)
+        yield sse_event("status", {"status": "generating", "chapters": total})
+
+        chapters: dict[int, str] = {}
+        usage = {"input_tokens": 0, "output_tokens": 0, "cache_read_input_tokens": 0}
+        async for index, markdown, chapter_usage in generate_chapters(whitepaper_data):
+            chapters[index] = markdown
+            for name, value in chapter_usage.items():
+                usage[name] += value
+            yield sse_event("chapter", {
+                "index": index,
+                "title": WHITEPAPER_CHAPTERS[index][0],
+                "content": markdown,
+                "current": len(chapters),
+                "total": total,
+            })
+
+        markdown = assemble(chapters)
+        await whitepaper_cache.record(session_id, key, markdown)
+
+        yield sse_event("usage", usage)
+        yield sse_event("whitepaper", {"session_id": session_id, "whitepaper_markdown": markdown, "cached": False})
+        yield sse_event("done", {"session_id": session_id})
+
+    except Exception as e:
+        yield sse_event("error", {"message": str(e)})
@@ -0,0 +1,137 @@
+import json
+
+import aiosqlite
+
+from config import settings
+from models.whitepaper import WHITEPAPER_SECTIONS
+
+# Completion is the share of the known sections that have content
+_COMPLETION_SQL = f"""
+    SELECT ROUND(COUNT(*) * 100.0 / {len(WHITEPAPER_SECTIONS)}, 1)
+    FROM whitepaper_sections
+    WHERE session_id = ? AND content <> ''
+      AND key IN ({", ".join("?" * len(WHITEPAPER_SECTIONS))})
+"""
+
+
+def section_text(value) -> str:
+    """Sections are stored as text; anything else the model sends is kept as JSON."""
+    if not value:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+async def read_sections(db: aiosqlite.Connection, session_id: str) -> dict[str, str]:
+    """All sections of a whitepaper, in the order they were first written."""
+    cursor = await db.execute(
+        "SELECT key, content FROM whitepaper_sections WHERE session_id = ? ORDER BY rowid",
+        (session_id,),
+    )
+    return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def upsert_sections(db: aiosqlite.Connection, session_id: str, updates: dict):
+    """
+    Write only the sections that changed, record the change as a revision
+    and bump the whitepaper's timestamp. An update that changes nothing
+    writes nothing. Must run inside a write transaction.
+    """
+    new = {key: section_text(value) for key, value in updates.items()}
+    if not new:
+        return
+    cursor = await db.execute(
+        f"SELECT key, content FROM whitepaper_sections WHERE session_id = ? AND key IN ({', '.join('?' * len(new))})",
+        (session_id, *new),
+    )
+    old = {row[0]: row[1] for row in await cursor.fetchall()}
+    changed = {key: content for key, content in new.items() if old.get(key) != content}
+
+    if not changed:
+        return
+    await db.executemany(
+        """INSERT INTO whitepaper_sections (session_id, key, content) VALUES (?, ?, ?)
+        ON CONFLICT(session_id, key) DO UPDATE SET
+            content = excluded.content,
+            updated_at = CURRENT_TIMESTAMP""",
+        [(session_id, key, content) for key, content in changed.items()],
+    )
+    await record_revision(db, session_id, changed)
+    await db.execute(
+        """INSERT INTO whitepapers (session_id) VALUES (?)
+        ON CONFLICT(session_id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP""",
+        (session_id,),
+    )
+
+
+async def record_revision(db: aiosqlite.Connection, session_id: str, changed: dict[str, str]):
+    """
+    Append a revision holding just the changed sections. Every
+    WHITEPAPER_CHECKPOINT_INTERVAL revisions a full snapshot is stored
+    instead, so rebuilding any revision replays fewer than that many deltas.
+    """
+    cursor = await db.execute(
+        """SELECT COALESCE(MAX(rev), 0), COALESCE(MAX(CASE WHEN kind = 'checkpoint' THEN rev END), 0)
+        FROM whitepaper_revisions WHERE session_id = ?""",
+        (session_id,),
+    )
+    latest, checkpoint = await cursor.fetchone()
+    rev = latest + 1
+
+    if rev - checkpoint >= settings.WHITEPAPER_CHECKPOINT_INTERVAL:
+        kind, payload = "checkpoint", await read_sections(db, session_id)
+    else:
+        kind, payload = "delta", changed
+    await db.execute(
+        "INSERT INTO whitepaper_revisions (session_id, rev, kind, payload, changed) VALUES (?, ?, ?, ?, ?)",
+        (session_id, rev, kind, json.dumps(payload, ensure_ascii=False), json.dumps(list(changed))),
+    )
+
+
+async def list_revisions(db: aiosqlite.Connection, session_id: str) -> list[dict]:
+    cursor = await db.execute(
+        "SELECT rev, kind, changed, created_at FROM whitepaper_revisions WHERE session_id = ? ORDER BY rev",
+        (session_id,),
+    )
+    return [
+        {
+            "rev": row["rev"],
+            "kind": row["kind"],
+            "changed_sections": json.loads(row["changed"]),
+            "created_at": row["created_at"],
+        }
+        for row in await cursor.fetchall()
+    ]
+
+
+async def read_revision(db: aiosqlite.Connection, session_id: str, rev: int) -> dict[str, str] | None:
+    """The sections as they were at `rev`: nearest checkpoint plus the deltas after it."""
+    cursor = await db.execute(
+        """SELECT rev, kind, payload FROM whitepaper_revisions
+        WHERE session_id = ? AND rev <= ? AND rev >= COALESCE(
+            (SELECT MAX(rev) FROM whitepaper_revisions
+             WHERE session_id = ? AND rev <= ? AND kind = 'checkpoint'), 0)
+        ORDER BY rev""",
+        (session_id, rev, session_id, rev),
+    )
+    rows = await cursor.fetchall()
+    if not rows or rows[-1]["rev"] != rev:
+        return None
+
+    sections: dict[str, str] = {}
+    for row in rows:
+        if row["kind"] == "checkpoint":
+            sections = {}
+        sections.update(json.loads(row["payload"]))
+    return sections
+
+
+def completion_of(sections: dict) -> float:
+    """The same figure as `completion`, computed from sections already in memory."""
+    filled = sum(1 for key in WHITEPAPER_SECTIONS if section_text(sections.get(key)))
+    return round(filled * 100 / len(WHITEPAPER_SECTIONS), 1)
+
+
+async def completion(db: aiosqlite.Connection, session_id: str) -> float:
+    cursor = await db.execute(_COMPLETION_SQL, (session_id, *WHITEPAPER_SECTIONS))
+    row = await cursor.fetchone()
+    return row[0] or 0.0
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+from typing import Awaitable
+
+logger = logging.getLogger(__name__)
+
+# session id -> persistence tasks still in flight for it
+_pending: dict[str, set[asyncio.Task]] = {}
+
+
+def schedule(session_id: str, work: Awaitable) -> asyncio.Task:
+    """
+    Run `work` in the background, after the response that produced it has
+    been sent. Readers of the session call `settled` first, so they still see
+    its writes (read-your-writes).
+    """
+    task = asyncio.ensure_future(work)
+    tasks = _pending.setdefault(session_id, set())
+    tasks.add(task)
+
+    def done(finished: asyncio.Task):
+        tasks.discard(finished)
+        if not tasks and _pending.get(session_id) is tasks:
+            del _pending[session_id]
+        if not finished.cancelled() and finished.exception():
+            logger.error("Write-behind for session %s failed", session_id, exc_info=finished.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+async def settled(session_id: str | None = None):
+    """Wait for pending background writes of one session, or of all sessions."""
+    if session_id is None:
+        tasks = [task for group in _pending.values() for task in group]
+    else:
+        tasks = list(_pending.get(session_id, ()))
+    if tasks:
+        await asyncio.wait(tasks)
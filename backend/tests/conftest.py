@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's modules the way main.py does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import open_connection  # noqa: E402
+from database.migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db_path(tmp_path) -> str:
+    return str(tmp_path / "mindforge.db")
+
+
+@pytest.fixture
+async def db(db_path):
+    """A connection to a fresh database migrated to the latest schema."""
+    conn = await open_connection(db_path)
+    await migrate(conn)
+    yield conn
+    await conn.close()
+
+
+@pytest.fixture
+async def app_db(db_path, monkeypatch):
+    """The app's own connection pool and writer, pointed at a fresh database."""
+    from database import db as database
+    from database.writer import writer
+
+    monkeypatch.setattr(database.pool, "path", db_path)
+    monkeypatch.setattr(writer, "path", db_path)
+    await database.open_pool()
+    await database.init_db()
+    await writer.start()
+    yield
+    await writer.stop()
+    await database.close_pool()
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from services.clients import ClientRegistry
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_http_client_reuses_connections_across_requests():
+    connections = 0
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        nonlocal connections
+        connections += 1
+        # Answer every request on this connection until the client hangs up
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    registry = ClientRegistry()
+    await registry.open()
+    try:
+        for _ in range(5):
+            response = await registry.http.get(f"http://127.0.0.1:{port}/")
+            assert response.text == "ok"
+    finally:
+        await registry.close()
+        server.close()
+
+    assert connections == 1
+
+
+async def test_registry_hands_out_the_same_clients_until_closed():
+    registry = ClientRegistry()
+    await registry.open()
+    first = registry.http, registry.anthropic
+    await registry.open()
+    assert (registry.http, registry.anthropic) == first
+    await registry.close()
+    with pytest.raises(RuntimeError):
+        registry.http
@@ -0,0 +1,50 @@
+import random
+
+from config import settings
+from services.context_window import ConversationWindow, build_window_messages, split_window
+
+
+def fold(window: ConversationWindow, snapshot: ConversationWindow):
+    """Apply a summary update computed from an earlier snapshot, as the background task does."""
+    overflow, _ = split_window(snapshot)
+    if not overflow or overflow[-1]["id"] <= window.covered_through_id:
+        return
+    window.summary = f"summary through {overflow[-1]['id']}"
+    window.covered_through_id = overflow[-1]["id"]
+    window.turns_covered = snapshot.turns_covered + len(overflow)
+    window.turns = [t for t in window.turns if t["id"] > window.covered_through_id]
+
+
+def test_no_turn_is_ever_missing_from_context():
+    rng = random.Random(7)
+    window = ConversationWindow()
+    pending: list[ConversationWindow] = []
+    for turn_id in range(1, 201):
+        role = "user" if turn_id % 2 else "assistant"
+        window.turns.append({"id": turn_id, "role": role, "cleaned_text": "x" * rng.randint(10, 8000)})
+
+        # Summary updates start after a turn and land some turns later, or not at all
+        if rng.random() < 0.5:
+            pending.append(ConversationWindow(
+                window.summary, window.covered_through_id, window.turns_covered, list(window.turns),
+            ))
+        while pending and rng.random() < 0.4:
+            fold(window, pending.pop(0))
+
+        messages = build_window_messages(window, "next message")
+        in_context = len(messages) - 1
+        covered = window.covered_through_id
+        # Every turn is either folded into the summary or sent verbatim
+        assert covered + in_context == turn_id
+        assert [m["content"] for m in messages[:-1]] == [t["cleaned_text"] for t in window.turns]
+
+
+def test_split_window_keeps_recent_turns_and_starts_with_user():
+    turns = [
+        {"id": i, "role": "user" if i % 2 else "assistant", "cleaned_text": "hello"}
+        for i in range(1, 21)
+    ]
+    overflow, verbatim = split_window(ConversationWindow(turns=turns))
+    assert overflow + verbatim == turns
+    assert verbatim[0]["role"] == "user"
+    assert len(verbatim) <= settings.CONTEXT_KEEP_TURNS
@@ -0,0 +1,41 @@
+import pytest
+
+from config import settings
+from database.db import connection
+from services import fetch_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def fresh_total(monkeypatch):
+    monkeypatch.setattr(fetch_cache, "_total_bytes", None)
+
+
+async def cached_keys() -> list[str]:
+    async with connection() as db:
+        cursor = await db.execute("SELECT url_key FROM fetch_cache ORDER BY url_key")
+        return [row["url_key"] for row in await cursor.fetchall()]
+
+
+async def table_bytes() -> int:
+    async with connection() as db:
+        cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM fetch_cache")
+        return (await cursor.fetchone())[0]
+
+
+async def test_running_total_follows_inserts_and_replacements(app_db):
+    await fetch_cache.store("a", {"text": "x" * 100}, None, None)
+    await fetch_cache.store("b", {"text": "y" * 50}, None, None)
+    await fetch_cache.store("a", {"text": "z" * 10}, None, None)
+
+    assert fetch_cache._total_bytes == await table_bytes()
+
+
+async def test_least_recently_used_pages_are_evicted_over_budget(app_db, monkeypatch):
+    monkeypatch.setattr(settings, "FETCH_CACHE_MAX_BYTES", 250)
+    for key in "abc":
+        await fetch_cache.store(key, {"text": "x" * 100}, None, None)
+
+    assert await cached_keys() == ["b", "c"]
+    assert fetch_cache._total_bytes == await table_bytes() <= 250
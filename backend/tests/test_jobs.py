@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from database.writer import writer
+from services import jobs as jobs_module
+from services.jobs import JobFeed, JobKind, JobQueue, competitor_progress, get_job, whitepaper_progress
+from services.sse import sse_event
+
+pytestmark = pytest.mark.anyio
+
+
+def test_competitor_progress_leaves_room_for_the_analysis():
+    fetched = competitor_progress("site_fetched", {"current": 3, "total": 3})
+    assert fetched < 1.0
+    assert competitor_progress("status", {"status": "analyzing_with_ai"}) >= fetched
+    assert competitor_progress("token", {"text": "x"}) is None
+
+
+def test_whitepaper_progress_reaches_one_only_on_success():
+    assert whitepaper_progress("chapter", {"current": 14, "total": 14}) < 1.0
+    assert whitepaper_progress("chapter", {"current": 7, "total": 14}) < whitepaper_progress(
+        "chapter", {"current": 8, "total": 14}
+    )
+
+
+async def test_feed_keeps_a_bounded_number_of_frames(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_FEED_MAX_FRAMES", 5)
+    feed = JobFeed()
+    for seq in range(1, 101):
+        await feed.publish(seq, f"frame {seq}")
+    await feed.finish()
+
+    assert len(feed.frames) == 5
+    assert [seq async for seq, _ in feed.follow(0)] == [96, 97, 98, 99, 100]
+
+
+async def test_follower_behind_the_feed_catches_up_from_stored_events(app_db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_FEED_MAX_FRAMES", 2)
+    queue = JobQueue(workers=0)
+    await writer.execute(
+        "INSERT INTO jobs (id, kind, session_id, status, created_at) VALUES ('j1', 'whitepaper', 's1', 'running', ?)",
+        (time.time(),),
+    )
+    feed = queue._feeds["j1"] = JobFeed()
+    for seq in range(1, 6):
+        frame = sse_event("token" if seq % 2 else "chapter", {"seq": seq})
+        await feed.publish(seq, frame)
+        if seq % 2 == 0:
+            await queue._record_event("j1", seq, frame, None)
+    await feed.finish()
+
+    frames = [frame async for frame in queue.follow("j1")]
+    # Stored chapters 2 and the live tail 4, 5; the dropped token 1 and 3 are gone
+    assert [f'"seq": {n}' in frame for n, frame in zip((2, 4, 5), frames)] == [True, True, True]
+    assert len(frames) == 3
+
+
+async def test_requeued_job_keeps_its_events(app_db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_STALE_AFTER", 0)
+    queue = JobQueue(workers=0)
+    await writer.execute(
+        """INSERT INTO jobs (id, kind, session_id, status, attempts, created_at, heartbeat_at)
+        VALUES ('j1', 'whitepaper', 's1', 'running', 1, ?, ?)""",
+        (time.time(), time.time() - 10),
+    )
+    await queue._record_event("j1", 1, sse_event("status", {"status": "generating"}), None)
+    await queue._requeue_stale()
+
+    assert (await get_job("j1"))["status"] == "queued"
+    assert [row["seq"] for row in await queue._stored_events("j1", 0)] == [1]
+
+
+@pytest.fixture
+def echo_kind(monkeypatch):
+    """A job kind that answers at once, or fails with a not-found code when asked to."""
+    async def run(session_id, params):
+        if params.get("missing"):
+            yield sse_event("error", {"message": "Nothing here", "code": "not_found"})
+            return
+        yield sse_event("result", {"session_id": session_id})
+
+    monkeypatch.setitem(jobs_module.JOB_KINDS, "echo", JobKind(run, "result", lambda event, data: None))
+
+
+async def test_followers_wake_when_a_local_worker_starts_the_job(app_db, echo_kind, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 30)
+    queue = JobQueue(workers=1)
+    job_id = await queue.enqueue("echo", "s1", {})
+    follower = queue.follow(job_id)
+    # Nobody is working yet: the follower says so instead of staying silent
+    assert '"queued"' in await follower.__anext__()
+
+    await queue.start()
+    try:
+        started = time.perf_counter()
+        rest = [frame async for frame in follower]
+        assert time.perf_counter() - started < 5
+        assert "event: result" in rest[0]
+        assert (await queue.wait(job_id))["status"] == "succeeded"
+        assert not queue._started
+    finally:
+        await queue.stop()
+
+
+async def test_failure_keeps_the_error_code(app_db, echo_kind):
+    queue = JobQueue(workers=1)
+    await queue.start()
+    try:
+        job = await queue.wait(await queue.enqueue("echo", "s1", {"missing": True}))
+    finally:
+        await queue.stop()
+
+    assert (job["status"], job["error"], job["error_code"]) == ("failed", "Nothing here", "not_found")
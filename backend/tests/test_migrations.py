@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from database.db import open_connection
+from database.migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version, migrate
+from services import whitepaper_store
+
+pytestmark = pytest.mark.anyio
+
+
+async def migrate_to(db, version: int):
+    """Apply the first `version` migrations only, as an older release would have."""
+    import database.migrations as migrations
+
+    saved = migrations.MIGRATIONS, migrations.SCHEMA_VERSION
+    migrations.MIGRATIONS, migrations.SCHEMA_VERSION = MIGRATIONS[:version], version
+    try:
+        await migrations.migrate(db)
+    finally:
+        migrations.MIGRATIONS, migrations.SCHEMA_VERSION = saved
+
+
+async def test_fresh_database_reaches_latest_version(db):
+    assert await get_schema_version(db) == SCHEMA_VERSION
+
+
+async def test_migrating_again_is_a_no_op(db):
+    assert await migrate(db) == 0
+    assert await get_schema_version(db) == SCHEMA_VERSION
+
+
+async def test_database_from_before_versioning_is_adopted(db_path):
+    conn = await open_connection(db_path)
+    try:
+        # Tables as the unversioned release created them, with data in them
+        await migrate_to(conn, 1)
+        await conn.execute("PRAGMA user_version = 0")
+        await conn.execute("INSERT INTO sessions (id, name) VALUES ('s1', 'Old')")
+        await conn.commit()
+
+        assert await migrate(conn) == SCHEMA_VERSION
+        cursor = await conn.execute("SELECT name FROM sessions WHERE id = 's1'")
+        assert (await cursor.fetchone())["name"] == "Old"
+    finally:
+        await conn.close()
+
+
+async def test_whitepaper_blobs_become_section_rows(db_path):
+    conn = await open_connection(db_path)
+    try:
+        await migrate_to(conn, 5)
+        await conn.execute("INSERT INTO sessions (id, name) VALUES ('s1', 'a'), ('s2', 'b')")
+        await conn.execute(
+            "INSERT INTO whitepapers (session_id, content) VALUES (?, ?), ('s2', 'not json')",
+            ("s1", json.dumps({"project_overview": "Bakery", "core_features": ["cart", "pay"], "security": ""})),
+        )
+        await conn.commit()
+
+        await migrate(conn)
+        assert await whitepaper_store.read_sections(conn, "s1") == {
+            "project_overview": "Bakery",
+            "core_features": '["cart","pay"]',
+            "security": "",
+        }
+        assert await whitepaper_store.read_sections(conn, "s2") == {}
+        # History starts with a checkpoint of what was migrated
+        assert await whitepaper_store.read_revision(conn, "s1", 1) == await whitepaper_store.read_sections(conn, "s1")
+    finally:
+        await conn.close()
+
+
+async def test_duplicate_learned_rules_are_merged(db_path):
+    conn = await open_connection(db_path)
+    try:
+        await migrate_to(conn, 9)
+        await conn.executemany(
+            "INSERT INTO learned_rules (category, rule_text, times_applied) VALUES (?, ?, ?)",
+            [
+                ("business", "Ask about delivery radius for food businesses.", 1),
+                ("business", "Always ask about the delivery radius of food businesses.", 4),
+                ("design", "Ask about delivery radius for food businesses.", 0),
+                ("business", "Check whether payments need invoices.", 2),
+            ],
+        )
+        await conn.commit()
+
+        await migrate(conn)
+        cursor = await conn.execute(
+            "SELECT id, category, times_applied, times_merged FROM learned_rules WHERE active = 1 ORDER BY id"
+        )
+        # The most-applied wording absorbs its twin; other categories and rules stay apart
+        assert [tuple(row) for row in await cursor.fetchall()] == [
+            (2, "business", 5, 1),
+            (3, "design", 0, 0),
+            (4, "business", 2, 0),
+        ]
+    finally:
+        await conn.close()
@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from config import settings
+from services import competitor_analyzer
+from services.competitor_analyzer import read_page
+from services.page_extractor import BODY_BUDGET_CHARS, MAX_LINKS, PageExtractor
+
+pytestmark = pytest.mark.anyio
+
+HEAD = "<html><head><title>Bakery</title><meta name='description' content='Fresh bread'></head><body>"
+
+
+@pytest.fixture(autouse=True)
+def parse_pool():
+    yield
+    competitor_analyzer.shutdown_parse_pool()
+
+
+async def endless(start: str, filler: str = "<p>lorem ipsum</p>"):
+    """A response body that never ends on its own."""
+    yield start.encode()
+    while True:
+        yield filler.encode()
+
+
+def test_enough_once_the_link_quota_is_full():
+    extractor = PageExtractor()
+    extractor.feed(HEAD + "<h1>Breads</h1>")
+    assert not extractor.enough
+
+    extractor.feed("".join(f"<a href='/p{n}'>Page {n}</a>" for n in range(MAX_LINKS)))
+    # Far fewer than MAX_HEADINGS headings is no reason to keep reading
+    assert extractor.enough
+
+
+def test_enough_after_the_body_budget():
+    extractor = PageExtractor()
+    extractor.feed("<html><head>" + "<!-- x -->" * BODY_BUDGET_CHARS)
+    assert not extractor.enough  # still in the head
+
+    extractor.feed("</head><body><a href='/'>Home</a>")
+    extractor.feed("<p>text</p>" * (BODY_BUDGET_CHARS // 11 + 1))
+    assert extractor.enough
+
+
+async def test_reading_stops_early_on_a_link_heavy_page():
+    body = endless(HEAD + "".join(f"<a href='/p{n}'>Page {n}</a>" for n in range(MAX_LINKS)))
+
+    page = await read_page(httpx.Response(200, content=body))
+
+    assert page["title"] == "Bakery"
+    assert len(page["navigation_links"]) == MAX_LINKS
+    # The first chunk already has everything
+    assert page["content_length"] <= competitor_analyzer.PAGE_CHUNK_BYTES < settings.COMPETITOR_MAX_PAGE_BYTES
+
+
+async def test_reading_stops_at_the_byte_cap_without_a_body(monkeypatch):
+    monkeypatch.setattr(settings, "COMPETITOR_MAX_PAGE_BYTES", 256 * 1024)
+    # A head that never closes: only the byte cap ends the read
+    body = endless("<html><head><title>Endless</title>", filler="<!-- padding -->")
+
+    page = await read_page(httpx.Response(200, content=body))
+
+    assert page["title"] == "Endless"
+    cap = settings.COMPETITOR_MAX_PAGE_BYTES
+    assert cap <= page["content_length"] < cap + competitor_analyzer.PAGE_CHUNK_BYTES
@@ -0,0 +1,80 @@
+from services.rule_index import RuleIndex
+from services.rule_text import terms
+
+
+def ids(results: list[dict]) -> list[int]:
+    return [r["id"] for r in results]
+
+
+def build(*rules: tuple[str, str]) -> RuleIndex:
+    index = RuleIndex()
+    for rule_id, (category, rule_text) in enumerate(rules, start=1):
+        index.add(rule_id, category, rule_text)
+    return index
+
+
+def test_ranks_rules_by_relevance_to_the_query():
+    index = build(
+        ("business", "Ask about delivery radius for food businesses."),
+        ("security", "Check how passwords are stored and reset."),
+        ("business", "Ask whether delivery is done by couriers or partners."),
+    )
+
+    assert ids(index.search("we deliver food within the city radius", 8, 5)) == [1, 3]
+    assert index.search("quantum chromodynamics", 8, 5) == []
+
+
+def test_caps_results_per_category_and_in_total():
+    index = build(*[("design", f"Ask about brand colours variant{n}") for n in range(4)], ("pages", "Brand landing page"))
+
+    results = index.search("brand colours page", 3, 2)
+    assert len(results) == 3
+    assert sum(r["category"] == "design" for r in results) == 2
+
+
+def test_context_steers_without_drowning_the_message():
+    index = build(
+        ("payments", "Ask which payment providers the shop must support."),
+        ("design", "Ask for the visual design style, colours and typography of the pages."),
+    )
+    context = "Design Pages Visual Style Typography"
+
+    # Plenty of context terms still lose to the one thing the message is about
+    assert ids(index.search("which payment providers", 1, 5, context=context)) == [1]
+    # With nothing in the message to go on, the context decides
+    assert ids(index.search("hello", 1, 5, context=context)) == [2]
+
+
+def test_usage_breaks_ties_and_lifts_close_calls():
+    index = build(
+        ("business", "Ask about opening hours."),
+        ("business", "Ask about opening hours!"),
+    )
+    assert ids(index.search("opening hours", 2, 5)) == [1, 2]
+
+    index.record_usage([2])
+    assert ids(index.search("opening hours", 2, 5)) == [2, 1]
+
+
+def test_rules_can_be_added_and_removed_incrementally():
+    index = build(("business", "Ask about delivery radius."))
+    index.add(2, "business", "Ask about delivery fees.")
+    index.add(2, "business", "Re-adding an indexed rule changes nothing.")
+    assert ids(index.search("delivery fees", 8, 5)) == [2, 1]
+
+    index.remove(2)
+    assert 2 not in index
+    assert ids(index.search("delivery fees", 8, 5)) == [1]
+    assert index.vocabulary_size == len(set(terms("business Ask about delivery radius.")))
+
+
+def test_most_similar_looks_only_within_the_category():
+    index = build(
+        ("business", "Ask about delivery radius for food businesses."),
+        ("design", "Ask about delivery radius for food businesses."),
+        ("business", "Check whether payments need invoices."),
+    )
+    rule_terms = frozenset(terms("Always ask about the delivery radius of food businesses."))
+
+    assert index.most_similar("business", rule_terms) == (1, 1.0)
+    assert index.most_similar("admin", rule_terms) == (None, 0.0)
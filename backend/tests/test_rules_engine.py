@@ -0,0 +1,33 @@
+import pytest
+
+from services import rule_index
+from services.rules_engine import insert_learned_rule
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    rule_index.index.clear()
+    yield
+    rule_index.index.clear()
+
+
+async def test_new_rule_is_inserted_and_indexed(db):
+    rule_id, created = await insert_learned_rule(db, "business", "Ask about delivery radius for food businesses.")
+
+    assert created
+    assert rule_id in rule_index.index
+    cursor = await db.execute("SELECT category, times_merged FROM learned_rules WHERE id = ?", (rule_id,))
+    assert tuple(await cursor.fetchone()) == ("business", 0)
+
+
+async def test_near_duplicate_merges_into_indexed_rule(db):
+    first, _ = await insert_learned_rule(db, "business", "Ask about delivery radius for food businesses.")
+    second, created = await insert_learned_rule(db, "business", "Always ask about the delivery radius of food businesses.")
+    other, other_created = await insert_learned_rule(db, "design", "Ask about delivery radius for food businesses.")
+
+    assert (second, created) == (first, False)
+    assert other_created and other != first
+    cursor = await db.execute("SELECT COUNT(*), MAX(times_merged) FROM learned_rules WHERE category = 'business'")
+    assert tuple(await cursor.fetchone()) == (1, 1)
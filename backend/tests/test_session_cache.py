@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from config import settings
+from services import session_cache
+from services.session_cache import SessionContext
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(session_cache, "_entries", type(session_cache._entries)())
+    monkeypatch.setattr(session_cache, "_total_bytes", 0)
+    monkeypatch.setattr(session_cache, "_loading", {})
+
+
+@pytest.fixture
+def slow_load(monkeypatch):
+    """Replace the database load with one the test releases by hand."""
+    release = asyncio.Event()
+    calls = []
+
+    async def load(session_id):
+        calls.append(session_id)
+        await release.wait()
+        return SessionContext(niche_type="from-db")
+
+    monkeypatch.setattr(session_cache, "_load", load)
+    return release, calls
+
+
+async def test_growing_entries_are_evicted_past_the_byte_limit(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_CACHE_MAX_BYTES", 1000)
+    session_cache.prime("old")
+    session_cache.prime("new")
+    for n in range(5):
+        session_cache.append_turn("old", n, "user", "x" * 150)
+
+    assert session_cache._total_bytes <= settings.SESSION_CACHE_MAX_BYTES
+    session_cache.append_turn("new", 10, "user", "y" * 400)
+    assert "old" not in session_cache._entries
+    assert session_cache._total_bytes == session_cache._entries["new"].size
+
+
+async def test_concurrent_misses_share_one_load(slow_load):
+    release, calls = slow_load
+    waiters = [asyncio.create_task(session_cache.get("s1")) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == ["s1"]
+    assert all(ctx is results[0] for ctx in results)
+    assert session_cache._entries["s1"] is results[0]
+
+
+async def test_invalidation_during_a_load_keeps_the_result_out_of_the_cache(slow_load):
+    release, _ = slow_load
+    waiter = asyncio.create_task(session_cache.get("s1"))
+    await asyncio.sleep(0)
+    session_cache.invalidate("s1")
+    release.set()
+    await waiter
+
+    assert "s1" not in session_cache._entries
+    assert session_cache._loading == {}
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load(slow_load):
+    release, _ = slow_load
+    first = asyncio.create_task(session_cache.get("s1"))
+    second = asyncio.create_task(session_cache.get("s1"))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert (await second).niche_type == "from-db"
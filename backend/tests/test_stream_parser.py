@@ -0,0 +1,63 @@
+import random
+import re
+
+import pytest
+
+from services.stream_parser import TagStreamParser
+
+TAGS = ("analysis", "gaps", "questions", "whitepaper_update")
+
+RESPONSE = """Sure! Let's think about a < b and <b>bold</b> things.
+<analysis>A bakery wants online orders.</analysis>
+<gaps>No delivery info; 3 < 4 > 2</gaps>
+<questions>1. Delivery?
+2. Payments?</questions>
+<whitepaper_update>{"project_overview": "Bakery <site>"}</whitepaper_update>
+Trailing text."""
+
+
+def reference(text: str) -> dict[str, str]:
+    sections = {}
+    for tag in TAGS:
+        match = re.search(rf"<{tag}>(.*?)</{tag}>", text, re.DOTALL)
+        if match:
+            sections[tag] = match.group(1).strip()
+    return sections
+
+
+def parse_in_chunks(text: str, sizes: list[int]) -> tuple[TagStreamParser, list[str]]:
+    parser = TagStreamParser(TAGS)
+    order, pos = [], 0
+    for size in sizes:
+        order += [tag for tag, _ in parser.feed(text[pos:pos + size])]
+        pos += size
+    order += [tag for tag, _ in parser.feed(text[pos:])]
+    order += [tag for tag, _ in parser.close()]
+    return parser, order
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_any_chunking_gives_the_same_sections_as_a_regex(seed):
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 12) for _ in range(len(RESPONSE))]
+    parser, order = parse_in_chunks(RESPONSE, sizes)
+    assert parser.sections == reference(RESPONSE)
+    assert order == list(TAGS)
+
+
+def test_section_is_emitted_as_soon_as_it_closes():
+    parser = TagStreamParser(TAGS)
+    assert parser.feed("<analysis>Hello</anal") == []
+    assert parser.feed("ysis> more") == [("analysis", "Hello")]
+
+
+def test_first_occurrence_wins():
+    parser, _ = parse_in_chunks("<gaps>one</gaps><gaps>two</gaps>", [3] * 20)
+    assert parser.get("gaps") == "one"
+
+
+def test_unclosed_section_does_not_hide_later_ones():
+    text = "<analysis>never closed <gaps>found</gaps>"
+    parser, _ = parse_in_chunks(text, [5] * 20)
+    assert parser.get("analysis") is None
+    assert parser.get("gaps") == "found"
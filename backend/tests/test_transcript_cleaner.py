@@ -0,0 +1,50 @@
+import pytest
+
+from config import settings
+from services.transcript_cleaner import clean_locally
+
+
+@pytest.mark.parametrize("raw", [
+    "etsy.com",
+    "bob@mail.ru",
+    "node.js",
+    "The U.S. market, e.g.",
+    "re-read",
+    "Send it to bob@mail.ru and link etsy.com in the footer.",
+])
+def test_dotted_at_and_hyphenated_tokens_pass_through(raw):
+    cleaned = clean_locally(raw)
+    for token in raw.rstrip(".").split():
+        assert token.strip(",") in cleaned.text
+
+
+@pytest.mark.parametrize("raw, kept", [
+    ("I had had enough of the old site", "had had"),
+    ("We need it so that that page loads fast", "that that"),
+])
+def test_grammatical_doubles_are_kept(raw, kept):
+    assert kept in clean_locally(raw).text
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("I w-w-want um a site for my bakery", "I want a site for my bakery."),
+    ("we we need a cart", "We need a cart."),
+    ("um, I want, uh, an online shop", "I want an online shop."),
+])
+def test_fillers_and_stutters_are_removed(raw, expected):
+    assert clean_locally(raw).text == expected
+
+
+def test_clean_dictation_scores_high():
+    cleaned = clean_locally("Um, I want a website for my bakery. Customers should order cakes online.")
+    assert cleaned.score >= settings.TRANSCRIPT_MIN_QUALITY
+
+
+def test_heavily_changed_output_scores_low():
+    cleaned = clean_locally("I I I want, uh, a shop a shop a shop")
+    assert cleaned.score < settings.TRANSCRIPT_MIN_QUALITY
+
+
+def test_long_unpunctuated_dictation_goes_to_the_model():
+    raw = " ".join(["we want a shop that sells cakes and bread to people in town"] * 4)
+    assert clean_locally(raw).score < settings.TRANSCRIPT_MIN_QUALITY
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from config import settings
+from models.whitepaper import WHITEPAPER_SECTIONS
+from services import whitepaper_store
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def session(db):
+    await db.execute("INSERT INTO sessions (id, name) VALUES ('s1', 'a')")
+    await db.execute("INSERT INTO whitepapers (session_id, updated_at) VALUES ('s1', '2000-01-01 00:00:00')")
+    await db.commit()
+    return "s1"
+
+
+async def whitepaper_updated_at(db, session_id):
+    cursor = await db.execute("SELECT updated_at FROM whitepapers WHERE session_id = ?", (session_id,))
+    return (await cursor.fetchone())[0]
+
+
+async def test_every_revision_rebuilds_to_the_state_it_recorded(db, session):
+    rng = random.Random(3)
+    states = {}
+    for rev in range(1, 3 * settings.WHITEPAPER_CHECKPOINT_INTERVAL + 2):
+        keys = rng.sample(WHITEPAPER_SECTIONS, rng.randint(1, 3))
+        await whitepaper_store.upsert_sections(db, session, {key: f"{key} v{rev}" for key in keys})
+        await db.commit()
+        states[rev] = await whitepaper_store.read_sections(db, session)
+
+    for rev, state in states.items():
+        assert await whitepaper_store.read_revision(db, session, rev) == state
+    assert await whitepaper_store.read_revision(db, session, len(states) + 1) is None
+
+    kinds = [r["kind"] for r in await whitepaper_store.list_revisions(db, session)]
+    assert "checkpoint" in kinds
+
+
+async def test_revision_records_only_changed_sections(db, session):
+    await whitepaper_store.upsert_sections(db, session, {"project_overview": "Bakery", "security": "TLS"})
+    await whitepaper_store.upsert_sections(db, session, {"project_overview": "Bakery", "security": "TLS + 2FA"})
+    await db.commit()
+
+    revisions = await whitepaper_store.list_revisions(db, session)
+    assert [r["changed_sections"] for r in revisions] == [["project_overview", "security"], ["security"]]
+
+
+async def test_update_that_changes_nothing_writes_nothing(db, session):
+    await whitepaper_store.upsert_sections(db, session, {"project_overview": "Bakery"})
+    await db.execute("UPDATE whitepapers SET updated_at = '2000-01-01 00:00:00' WHERE session_id = ?", (session,))
+    await db.commit()
+
+    await whitepaper_store.upsert_sections(db, session, {"project_overview": "Bakery"})
+    await db.commit()
+
+    assert await whitepaper_updated_at(db, session) == "2000-01-01 00:00:00"
+    assert len(await whitepaper_store.list_revisions(db, session)) == 1
+
+
+async def test_completion_matches_in_memory_figure(db, session):
+    sections = {"project_overview": "Bakery", "security": "", "core_features": ["cart"]}
+    await whitepaper_store.upsert_sections(db, session, sections)
+    await db.commit()
+    assert await whitepaper_store.completion(db, session) == whitepaper_store.completion_of(sections)
@@ -0,0 +1,74 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+from database.db import open_connection
+from database.writer import DatabaseWriter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def writer(db, db_path):
+    await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    await db.commit()
+    writer = DatabaseWriter(db_path, max_batch=50)
+    await writer.start()
+    yield writer
+    await writer.stop()
+
+
+async def count(db_path: str) -> int:
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM items")
+        return (await cursor.fetchone())[0]
+
+
+async def test_concurrent_writes_share_one_commit(writer, db_path):
+    batches = []
+    commit_batch = writer._commit_batch
+
+    async def record(batch):
+        batches.append(len(batch))
+        await commit_batch(batch)
+
+    writer._commit_batch = record
+    ids = await asyncio.gather(*(
+        writer.execute("INSERT INTO items (name) VALUES (?)", (f"item-{n}",)) for n in range(20)
+    ))
+
+    assert sorted(ids) == list(range(1, 21))
+    assert batches == [20]
+    assert await count(db_path) == 20
+
+
+async def test_failed_operation_does_not_roll_back_its_neighbours(writer, db_path):
+    results = await asyncio.gather(
+        writer.execute("INSERT INTO items (name) VALUES ('a')"),
+        writer.execute("INSERT INTO items (name) VALUES ('a')"),
+        writer.execute("INSERT INTO items (name) VALUES ('b')"),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], aiosqlite.IntegrityError)
+    assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+    assert await count(db_path) == 2
+
+
+async def test_write_is_visible_to_other_connections_once_awaited(writer, db_path):
+    await writer.execute("INSERT INTO items (name) VALUES ('x')")
+    reader = await open_connection(db_path)
+    try:
+        cursor = await reader.execute("SELECT name FROM items")
+        assert [row["name"] for row in await cursor.fetchall()] == ["x"]
+    finally:
+        await reader.close()
+
+
+async def test_stop_flushes_queued_writes(writer, db_path):
+    pending = [writer.submit(lambda db, n=n: db.execute("INSERT INTO items (name) VALUES (?)", (f"q{n}",))) for n in range(5)]
+    await writer.stop()
+    await asyncio.gather(*pending)
+    assert await count(db_path) == 5
+    await writer.start()